@@ -1,34 +1,76 @@
-import math
 import os
 
+import numpy as np
+
+from edge_weights import EdgeWeightReader, TriangularMatrix
+from lazy_distances import HAS_KDTREE, LAZY_AUTO_NODES, LazyDistanceMatrix
+
 
 class CVRPInstance:
-    def __init__(self, filepath):
+    def __init__(self, filepath=None, lazy=None):
         self.filepath = filepath
+        # Distances of coordinate instances: dense matrix (False), computed on
+        # demand (True, lazy_distances) or lazy above LAZY_AUTO_NODES (None)
+        self.lazy = lazy
         self.name = ""
         self.dimension = 0
         self.capacity = 0
         self.edge_weight_type = "EUC_2D"
+        self.edge_weight_format = None
         self.depot = None
 
         # Raw Data
         self.coords = {}
         self.demands = {}
+        self.explicit_weights = None
 
-        # Internal Mapping
+        # Internal Mapping (the solver addresses nodes by dense index 0..n-1)
         self.nodes = []
         self.id_to_idx = {}
-        self.dist_matrix = []
+        self.depot_idx = None
+        self.node_demands = []
+        self.coord_array = None
+        self.dist_matrix = None
+        self.dist_rows = []
+
+        # Granular neighborhoods: customer index -> k nearest customer indices (closest first);
+        # neighbor_k is None until compute_neighbors() ran
+        self.neighbors = []
+        self.neighbor_k = None
+
+        if filepath is not None:
+            self._read_file(filepath)
+            self._validate_data()
+            self._compute_distances()
+
+    @classmethod
+    def from_data(cls, name, capacity, coords, demands, depot, edge_weight_type="EUC_2D",
+                  dist_matrix=None, filepath=None, lazy=None):
+        """
+        Builds an instance from in-memory data (node ID -> (x, y) / demand dicts)
+        instead of a .vrp file. A precomputed dist_matrix (ordered by sorted node
+        ID) is attached as is, e.g. a memory-mapped cache entry.
+        """
+        inst = cls(lazy=lazy)
+        inst.filepath = filepath
+        inst.name = name
+        inst.capacity = capacity
+        inst.edge_weight_type = edge_weight_type.upper()
+        inst.depot = depot
+        inst.coords = dict(coords)
+        inst.demands = dict(demands)
+        inst.dimension = len(inst.coords) or len(inst.demands)
 
-        self._read_file(filepath)
-        self._validate_data()
-        self._compute_distances()
+        inst._validate_data()
+        inst._compute_distances(dist_matrix)
+        return inst
 
     def _read_file(self, filepath):
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"File not found: {filepath}")
 
         section = None
+        reader = None
         with open(filepath, 'r') as f:
             for line in f:
                 line = line.strip()
@@ -42,11 +84,19 @@ class CVRPInstance:
                     self.capacity = int(line.split(":")[-1].strip())
                 elif line.startswith("EDGE_WEIGHT_TYPE"):
                     self.edge_weight_type = line.split(":")[-1].strip().upper()
+                elif line.startswith("EDGE_WEIGHT_FORMAT"):
+                    self.edge_weight_format = line.split(":")[-1].strip().upper()
 
                 # Section detection
-                elif line.startswith("NODE_COORD_SECTION"):
+                elif line.startswith("NODE_COORD_SECTION") or line.startswith("DISPLAY_DATA_SECTION"):
                     section = "COORD"
                     continue
+                elif line.startswith("EDGE_WEIGHT_SECTION"):
+                    if not self.dimension:
+                        raise ValueError("EDGE_WEIGHT_SECTION appears before DIMENSION.")
+                    reader = EdgeWeightReader(self.dimension, self.edge_weight_format or "FULL_MATRIX")
+                    section = "WEIGHTS"
+                    continue
                 elif line.startswith("DEMAND_SECTION"):
                     section = "DEMAND"
                     continue
@@ -57,7 +107,9 @@ class CVRPInstance:
                     break
 
                 # Parsing
-                if section == "COORD":
+                if section == "WEIGHTS":
+                    reader.feed(line)
+                elif section == "COORD":
                     parts = line.split()
                     self.coords[int(parts[0])] = (float(parts[1]), float(parts[2]))
                 elif section == "DEMAND":
@@ -70,9 +122,21 @@ class CVRPInstance:
                     elif self.depot is None:
                         self.depot = val
 
+        if reader is not None:
+            self.explicit_weights = reader.finish()
+
     def _validate_data(self):
+        # EXPLICIT instances may come without coordinates; their nodes are the demand entries
+        explicit_only = self.edge_weight_type == "EXPLICIT" and not self.coords
+
         # 1. Dimension Check
-        if len(self.coords) != self.dimension:
+        if explicit_only:
+            if len(self.demands) != self.dimension:
+                raise ValueError(
+                    f"Dimension mismatch: Header says {self.dimension}, "
+                    f"but found {len(self.demands)} demands."
+                )
+        elif len(self.coords) != self.dimension:
             raise ValueError(
                 f"Dimension mismatch: Header says {self.dimension}, "
                 f"but found {len(self.coords)} coordinates."
@@ -87,36 +151,120 @@ class CVRPInstance:
         # 3. Depot Check (Robustness Fix)
         if self.depot is None:
             raise ValueError("No depot defined in DEPOT_SECTION.")
-        if self.depot not in self.coords:
+        if explicit_only:
+            if self.depot not in self.demands:
+                raise ValueError(f"Depot ID {self.depot} has no demand entry.")
+        elif self.depot not in self.coords:
             raise ValueError(f"Depot ID {self.depot} has no coordinates.")
 
-    def _compute_distances(self):
-        self.nodes = sorted(self.coords.keys())
+    def _compute_distances(self, dist_matrix=None):
+        self.nodes = sorted(self.coords.keys() or self.demands.keys())
         self.num_nodes = len(self.nodes)
         self.id_to_idx = {uid: i for i, uid in enumerate(self.nodes)}
+        self.depot_idx = self.id_to_idx[self.depot]
+        self.node_demands = [self.demands[uid] for uid in self.nodes]
+        # Without coordinates (EXPLICIT only) the array is NaN, see has_coords
+        self.coord_array = np.array([self.coords.get(uid, (np.nan, np.nan)) for uid in self.nodes],
+                                    dtype=np.float64).reshape(-1, 2)
+
+        if dist_matrix is None and self.edge_weight_type == "EXPLICIT":
+            dist_matrix = self.explicit_weights
+            if dist_matrix is None:
+                raise ValueError("EDGE_WEIGHT_TYPE EXPLICIT requires an EDGE_WEIGHT_SECTION.")
+            # The section lists nodes in file order, i.e. by ascending ID
+            if len(dist_matrix) != self.num_nodes:
+                raise ValueError(f"EDGE_WEIGHT_SECTION is {len(dist_matrix)} x {len(dist_matrix)}, "
+                                 f"but the instance has {self.num_nodes} nodes.")
+            # 2-opt reversals and the relocate/swap deltas would silently compute wrong costs
+            if isinstance(dist_matrix, np.ndarray) and not np.array_equal(dist_matrix, dist_matrix.T):
+                raise ValueError(f"{self.name} has an asymmetric FULL_MATRIX; only symmetric distances are supported.")
+            self.explicit_weights = None
 
-        # Initialize matrix
-        self.dist_matrix = [[0.0] * self.num_nodes for _ in range(self.num_nodes)]
+        if dist_matrix is not None:
+            self.attach_distances(dist_matrix)
+            return
+
+        # One contiguous block: int32 for EUC_2D (rounded), float64 otherwise
         is_euc_2d = (self.edge_weight_type == "EUC_2D")
+        n = self.num_nodes
+        if self.lazy or (self.lazy is None and n > LAZY_AUTO_NODES):
+            # Linear memory: entries are computed from the coordinates when needed
+            self.attach_distances(LazyDistanceMatrix(self.coord_array, rounded=is_euc_2d, depot=self.depot_idx))
+            return
+
+        self.dist_matrix = np.empty((n, n), dtype=np.int32 if is_euc_2d else np.float64)
+
+        # Broadcast in row blocks to bound the float64 temporaries
+        xs = self.coord_array[:, 0]
+        ys = self.coord_array[:, 1]
+        block = max(1, (1 << 22) // max(1, n))
+        for start in range(0, n, block):
+            stop = min(n, start + block)
+            dist = np.hypot(xs[start:stop, None] - xs[None, :], ys[start:stop, None] - ys[None, :])
+            if is_euc_2d:
+                dist = np.floor(dist + 0.5)
+            self.dist_matrix[start:stop] = dist
+
+        self.attach_distances(self.dist_matrix)
+
+    def attach_distances(self, matrix):
+        # matrix may live in shared memory; dist_rows are views, never copies.
+        # Hot path: dist_rows[u][v] returns a plain int/float without NumPy scalar overhead
+        self.dist_matrix = matrix
+        if matrix is None:
+            self.dist_rows = []
+        elif isinstance(matrix, (TriangularMatrix, LazyDistanceMatrix)):
+            self.dist_rows = matrix.rows()
+        else:
+            self.dist_rows = [memoryview(row) for row in matrix]
+
+    @property
+    def has_coords(self):
+        return self.coord_array is not None and not np.isnan(self.coord_array).any()
+
+    def __getstate__(self):
+        # memoryviews cannot be pickled; they are rebuilt from dist_matrix on load
+        state = self.__dict__.copy()
+        state["dist_rows"] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attach_distances(self.dist_matrix)
 
-        for i in range(self.num_nodes):
-            u = self.nodes[i]
-            x1, y1 = self.coords[u]
-            for j in range(i + 1, self.num_nodes):
-                v = self.nodes[j]
-                x2, y2 = self.coords[v]
+    def compute_neighbors(self, k):
+        if k < 1:
+            raise ValueError(f"Neighbor list size must be at least 1, got {k}.")
+        n = self.num_nodes
+        # Every node gets a list; it only stays empty without another customer
+        k = max(0, min(k, n - 2))
 
-                dist_val = math.hypot(x1 - x2, y1 - y2)
-                if is_euc_2d:
-                    final_dist = int(dist_val + 0.5)
-                else:
-                    final_dist = dist_val
+        self.neighbors = [[] for _ in range(n)]
+        if k > 0 and isinstance(self.dist_matrix, LazyDistanceMatrix) and HAS_KDTREE:
+            # O(n log n) KD-tree queries instead of scanning every matrix row
+            self.neighbors = self.dist_matrix.nearest_neighbors(k, self.depot_idx)
+        elif k > 0:
+            block = max(1, (1 << 22) // max(1, n))
+            for start in range(0, n, block):
+                stop = min(n, start + block)
+                rows = self.dist_matrix[start:stop].astype(np.float64)
+                # Exclude the node itself and the depot from the candidates
+                rows[np.arange(stop - start), np.arange(start, stop)] = np.inf
+                rows[:, self.depot_idx] = np.inf
 
-                self.dist_matrix[i][j] = final_dist
-                self.dist_matrix[j][i] = final_dist
+                # Keep every node tied at the k-th distance, then order by
+                # (distance, node index) so boundary ties resolve by index
+                kth = np.partition(rows, k - 1, axis=1)[:, k - 1]
+                for i, u in enumerate(range(start, stop)):
+                    if u == self.depot_idx: continue
+                    candidates = np.flatnonzero(rows[i] <= kth[i])
+                    order = np.argsort(rows[i, candidates], kind="stable")[:k]
+                    self.neighbors[u] = candidates[order].tolist()
+        self.neighbor_k = k
 
     def distance(self, u, v):
+        # Compatibility wrapper addressing nodes by file ID; the solver indexes dist_rows directly
         try:
-            return self.dist_matrix[self.id_to_idx[u]][self.id_to_idx[v]]
+            return self.dist_rows[self.id_to_idx[u]][self.id_to_idx[v]]
         except KeyError:
             raise KeyError(f"Node ID {u} or {v} not found in instance data.")
\ No newline at end of file
@@ -0,0 +1,63 @@
+import random
+
+
+class AdaptiveWeights:
+    """
+    ALNS-style roulette wheel over a fixed set of options (operator names,
+    ruin settings, ...).
+
+    Every use of an option reports the cost improvement it produced and the
+    seconds it took. The option's weight is an exponentially decayed average of
+    improvement per second: w = (1 - reaction) * w + reaction * gain / seconds,
+    so options that stop paying off fade within a few dozen uses. choose()
+    draws an option with probability proportional to its weight plus a floor
+    of min_share times the mean weight, so no option is ever switched off;
+    order() ranks them by weight. Options not measured yet rank first, in
+    their given order.
+
+    bias (optional) maps options to fixed multipliers of their weight and
+    floor, e.g. user-given operator weights: an option with bias 3 is drawn
+    three times as often as one with bias 1 that performs equally well.
+    """
+
+    def __init__(self, options, reaction=0.1, min_share=0.05, bias=None):
+        self.options = list(options)
+        self.reaction = reaction
+        self.min_share = min_share
+        self.bias = {o: 1.0 for o in self.options}
+        if bias is not None:
+            self.bias.update(bias)
+        self.weights = {o: None for o in self.options}
+        self.uses = {o: 0 for o in self.options}
+        self.gain = {o: 0.0 for o in self.options}
+        self.time = {o: 0.0 for o in self.options}
+
+    def update(self, option, gain, elapsed):
+        gain = max(0.0, gain)
+        self.uses[option] += 1
+        self.gain[option] += gain
+        self.time[option] += elapsed
+        rate = gain / max(elapsed, 1e-6)
+        w = self.weights[option]
+        self.weights[option] = rate if w is None else (1 - self.reaction) * w + self.reaction * rate
+
+    def choose(self):
+        unmeasured = [o for o in self.options if self.weights[o] is None]
+        if unmeasured:
+            return unmeasured[0]
+        weights = [self.weights[o] for o in self.options]
+        floor = self.min_share * sum(weights) / len(weights) or 1.0
+        return random.choices(self.options, weights=[(w + floor) * self.bias[o] for o, w in zip(self.options, weights)])[0]
+
+    def order(self):
+        # sorted() is stable: ties (and unmeasured options) keep the given order
+        return sorted(self.options, key=lambda o: -self.weights[o] * self.bias[o] if self.weights[o] is not None else -float('inf'))
+
+    def summary(self, label=str):
+        """One line per option: current weight, uses and lifetime improvement per second."""
+        lines = []
+        for o in self.order():
+            w = self.weights[o]
+            rate = self.gain[o] / self.time[o] if self.time[o] else 0.0
+            lines.append(f"{label(o):<16}{w if w is not None else 0.0:>12.1f}{self.uses[o]:>9}{rate:>14.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,169 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from CVRP_Instance import CVRPInstance
+from vns_solver import VNSSolver
+from main import read_bks
+
+FIELDS = ["instance", "seed", "cost", "bks", "gap", "vehicles", "time", "time_to_best",
+          "iterations", "iter_per_sec", "load_time"]
+
+
+def instance_key(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def solve_one(path, seed, max_seconds, max_iterations, solver_kwargs):
+    """Solves one (instance, seed) pair and returns its report row."""
+    random.seed(seed)
+
+    t0 = time.time()
+    inst = CVRPInstance(path)
+    load_time = time.time() - t0
+
+    solver = VNSSolver(inst, max_iterations=max_iterations, max_seconds=max_seconds,
+                       verbose=False, **solver_kwargs)
+    solution = solver.solve()
+
+    bks = read_bks(path)
+    return {
+        "instance": instance_key(path),
+        "seed": seed,
+        "cost": round(solution.cost, 3),
+        "bks": bks,
+        "gap": round((solution.cost - bks) / bks * 100, 4) if bks else None,
+        "vehicles": len(solution.routes),
+        "time": round(solver.elapsed, 3),
+        "time_to_best": round(solver.time_to_best, 3),
+        "iterations": solver.iterations,
+        "iter_per_sec": round(solver.iterations / solver.elapsed, 3) if solver.elapsed > 0 else None,
+        "load_time": round(load_time, 3),
+    }
+
+
+# =========================================================================
+#  REPORT (CSV or JSON, chosen by extension)
+# =========================================================================
+def load_report(path):
+    if not os.path.exists(path):
+        return []
+    if path.endswith(".json"):
+        with open(path, 'r') as f:
+            return json.load(f)
+    with open(path, 'r', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def append_report(path, row, rows):
+    rows.append(row)
+    if path.endswith(".json"):
+        # Rewrite atomically so an interrupted sweep never leaves a truncated file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(rows, f, indent=2)
+        os.replace(tmp_path, path)
+        return
+
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def collect_instances(patterns):
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if any(c in pattern for c in "*?[") else [pattern]
+        files.extend(m for m in matches if m.endswith(".vrp") and m not in files)
+    return files
+
+
+def run_batch(instances, seeds, max_seconds, max_iterations, jobs, out_path, solver_kwargs):
+    rows = load_report(out_path)
+    done = {(str(r["instance"]), int(r["seed"])) for r in rows}
+
+    tasks = []
+    for path in instances:
+        for seed in seeds:
+            if (instance_key(path), seed) in done: continue
+            tasks.append((path, seed))
+
+    skipped = len(instances) * len(seeds) - len(tasks)
+    if skipped:
+        print(f"-> Resuming: {skipped} finished runs already in {out_path}")
+
+    # Largest files first, so long runs do not end up last on a single worker
+    tasks.sort(key=lambda t: os.path.getsize(t[0]), reverse=True)
+    print(f"-> {len(tasks)} runs on {jobs} workers ({max_seconds}s / {max_iterations} iterations each)")
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(solve_one, path, seed, max_seconds, max_iterations, solver_kwargs): (path, seed)
+                   for path, seed in tasks}
+        for fut in as_completed(futures):
+            path, seed = futures[fut]
+            try:
+                row = fut.result()
+            except Exception as e:
+                print(f"[FAIL] {path} (seed {seed}): {e}")
+                continue
+
+            append_report(out_path, row, rows)
+            gap = f"{row['gap']:.2f}%" if row["gap"] is not None else "n/a"
+            print(f"[{len(rows)}] {row['instance']} seed={seed} cost={row['cost']:.2f} gap={gap} "
+                  f"it/s={row['iter_per_sec']}")
+
+    return rows
+
+
+def print_summary(rows):
+    by_instance = {}
+    for r in rows:
+        if r["gap"] not in (None, ""):
+            by_instance.setdefault(r["instance"], []).append(float(r["gap"]))
+
+    if not by_instance:
+        return
+    print("\n" + "=" * 40)
+    print(f"{'Instance':<20}{'Runs':>6}{'Avg Gap':>14}")
+    print("=" * 40)
+    for name in sorted(by_instance):
+        gaps = by_instance[name]
+        print(f"{name:<20}{len(gaps):>6}{sum(gaps) / len(gaps):>13.2f}%")
+    all_gaps = [g for gaps in by_instance.values() for g in gaps]
+    print("=" * 40)
+    print(f"{'Mean':<20}{len(all_gaps):>6}{sum(all_gaps) / len(all_gaps):>13.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch VNS benchmark over VRPLIB instances")
+    parser.add_argument("instances", nargs="*", default=["Instances/cvrp/*.vrp"],
+                        help="Instance files or glob patterns")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[42], help="Random seeds per instance")
+    parser.add_argument("--time", "-t", type=int, default=60, help="Max execution time per run")
+    parser.add_argument("--iter", type=int, default=2000, help="Max iterations per run")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Parallel processes")
+    parser.add_argument("--out", "-o", type=str, default="batch_results.csv", help="Report file (.csv or .json)")
+    parser.add_argument("--neighbors", "-k", type=int, default=30, help="Candidate list size (k nearest customers)")
+    args = parser.parse_args()
+
+    instances = collect_instances(args.instances)
+    if not instances:
+        print("Error: No .vrp instances matched.")
+        sys.exit(1)
+
+    rows = run_batch(instances, args.seeds, args.time, args.iter, args.jobs, args.out,
+                     {"neighbor_k": args.neighbors})
+    print_summary(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import numpy as np
+
+# Route pairs where the longer route has at least this many customers are
+# evaluated as numpy array expressions; shorter ones are cheaper in Python.
+VECTOR_MIN_LEN = 20
+
+
+class PairMoveEvaluator:
+    """
+    Exhaustive inter-route move evaluation for one pair of routes.
+
+    best_relocate() and best_swap() look at every (customer, position) or
+    (customer, customer) combination of the two routes and return the best
+    improving move as (delta, i, j), or None. With vectorized=True the deltas of
+    long routes are computed in one shot from distance submatrices gathered by
+    fancy indexing, with capacity masks from the route loads; the pure-Python
+    loops give the same moves and serve short routes and matrices that are not
+    plain ndarrays.
+    """
+
+    def __init__(self, instance, vectorized=True):
+        self.instance = instance
+        self.depot = instance.depot_idx
+        self.capacity = instance.capacity
+        self.vectorized = vectorized and isinstance(instance.dist_matrix, np.ndarray)
+        if self.vectorized:
+            self.matrix = instance.dist_matrix
+            self.flat = instance.dist_matrix.reshape(-1)
+            self.demand_array = np.asarray(instance.node_demands)
+            # Sentinel for infeasible moves in the matrix dtype (int32 for EUC_2D)
+            dtype = instance.dist_matrix.dtype
+            self.big = np.inf if dtype.kind == 'f' else np.iinfo(dtype).max
+        self._routes = {}
+
+    def best_relocate(self, r1, r2, l2):
+        """Best move of one customer of r1 to any position of r2 (load l2)."""
+        if self.vectorized and max(len(r1), len(r2)) >= VECTOR_MIN_LEN:
+            return self._relocate_numpy(r1, r2, l2)
+        return self._relocate_python(r1, r2, l2)
+
+    def best_swap(self, r1, l1, r2, l2):
+        """Best exchange of one customer of r1 with one customer of r2."""
+        if self.vectorized and max(len(r1), len(r2)) >= VECTOR_MIN_LEN:
+            return self._swap_numpy(r1, l1, r2, l2)
+        return self._swap_python(r1, l1, r2, l2)
+
+    # --- NUMPY ---
+    # Per pair only two submatrices are gathered (flat take with cached row
+    # offsets), S = M[pad1 x pad2] and T = M[pad2 x pad1] with routes padded by
+    # the depot at both ends; every distance term below is a slice of them. Per-route arrays are cached by
+    # route object, which copy-on-write routes make safe between changes.
+
+    def reset(self):
+        self._routes = {}
+
+    def _route_data(self, route):
+        entry = self._routes.get(id(route))
+        if entry is not None and entry[0] is route:
+            return entry
+        M = self.matrix
+        pad = np.array([self.depot] + route + [self.depot])
+        u, prev, nxt = pad[1:-1], pad[:-2], pad[2:]
+        arcs = M[pad[:-1], pad[1:]]
+        out_in = M[prev, u] + M[u, nxt]
+        gain = out_in - M[prev, nxt]
+        entry = (route, pad, pad * len(M), self.demand_array[u], out_in, gain, arcs)
+        self._routes[id(route)] = entry
+        return entry
+
+    def _relocate_numpy(self, r1, r2, l2):
+        _, pad1, rows1, dem1, _, gain1, _ = self._route_data(r1)
+        _, pad2, rows2, _, _, _, arcs2 = self._route_data(r2)
+        infeasible = dem1 > self.capacity - l2
+        if infeasible.all():
+            return None
+
+        n1, n2 = len(r1), len(r2)
+        S = self.flat.take(rows1[:, None] + pad2[None, :])
+        T = self.flat.take(rows2[:, None] + pad1[None, :])
+        # delta[i, k]: insert r1[i] between pad2[k] and pad2[k + 1]
+        delta = T[0:n2 + 1, 1:n1 + 1].T + S[1:n1 + 1, 1:n2 + 2]
+        delta -= arcs2[None, :]
+        delta -= gain1[:, None]
+        np.putmask(delta, np.broadcast_to(infeasible[:, None], delta.shape), self.big)
+
+        return self._best(delta)
+
+    def _swap_numpy(self, r1, l1, r2, l2):
+        _, pad1, rows1, dem1, old1, _, _ = self._route_data(r1)
+        _, pad2, rows2, dem2, old2, _, _ = self._route_data(r2)
+        # Load change of r1 is dem(r2[j]) - dem(r1[i]); r2 gets the opposite
+        diff = dem2[None, :] - dem1[:, None]
+        infeasible = (diff > self.capacity - l1) | (diff < l2 - self.capacity)
+        if infeasible.all():
+            return None
+
+        n1, n2 = len(r1), len(r2)
+        S = self.flat.take(rows1[:, None] + pad2[None, :])
+        T = self.flat.take(rows2[:, None] + pad1[None, :])
+        # r1[i] and r2[j] trade places: prev/next of each now point to the other
+        delta = S[0:n1, 1:n2 + 1] + T[1:n2 + 1, 2:n1 + 2].T
+        delta += T[0:n2, 1:n1 + 1].T
+        delta += S[1:n1 + 1, 2:n2 + 2]
+        delta -= old1[:, None]
+        delta -= old2[None, :]
+        np.putmask(delta, infeasible, self.big)
+
+        return self._best(delta)
+
+    @staticmethod
+    def _best(delta):
+        flat = int(delta.argmin())
+        i, j = divmod(flat, delta.shape[1])
+        value = delta[i, j].item()
+        return (value, i, j) if value < -0.001 else None
+
+    # --- PURE PYTHON ---
+
+    def _relocate_python(self, r1, r2, l2):
+        D = self.instance.dist_rows
+        demands = self.instance.node_demands
+        depot = self.depot
+        best = None
+        for i, u in enumerate(r1):
+            if l2 + demands[u] > self.capacity: continue
+            up = r1[i - 1] if i > 0 else depot
+            un = r1[i + 1] if i < len(r1) - 1 else depot
+            gain = D[up][u] + D[u][un] - D[up][un]
+            for k in range(len(r2) + 1):
+                a = r2[k - 1] if k > 0 else depot
+                b = r2[k] if k < len(r2) else depot
+                delta = D[a][u] + D[u][b] - D[a][b] - gain
+                if best is None or delta < best[0]:
+                    best = (delta, i, k)
+        return best if best is not None and best[0] < -0.001 else None
+
+    def _swap_python(self, r1, l1, r2, l2):
+        D = self.instance.dist_rows
+        demands = self.instance.node_demands
+        depot = self.depot
+        capacity = self.capacity
+        best = None
+        for i, u in enumerate(r1):
+            du = demands[u]
+            up = r1[i - 1] if i > 0 else depot
+            un = r1[i + 1] if i < len(r1) - 1 else depot
+            old_u = D[up][u] + D[u][un]
+            for j, v in enumerate(r2):
+                dv = demands[v]
+                if l1 - du + dv > capacity or l2 - dv + du > capacity: continue
+                vp = r2[j - 1] if j > 0 else depot
+                vn = r2[j + 1] if j < len(r2) - 1 else depot
+                delta = D[up][v] + D[v][un] + D[vp][u] + D[u][vn] - old_u - (D[vp][v] + D[v][vn])
+                if best is None or delta < best[0]:
+                    best = (delta, i, j)
+        return best if best is not None and best[0] < -0.001 else None
@@ -0,0 +1,277 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from CVRP_Instance import CVRPInstance
+from vns_solver import VNSSolver
+from main import read_bks
+from batch_runner import collect_instances, instance_key
+
+try:
+    from scipy.stats import mannwhitneyu
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# Fixed subset of Instances/cvrp: small to mid size, mixed route lengths and depot positions
+DEFAULT_INSTANCES = [
+    "Instances/cvrp/X-n101-k25.vrp",
+    "Instances/cvrp/X-n110-k13.vrp",
+    "Instances/cvrp/X-n139-k10.vrp",
+    "Instances/cvrp/X-n157-k13.vrp",
+    "Instances/cvrp/X-n200-k36.vrp",
+    "Instances/cvrp/X-n251-k28.vrp",
+]
+DEFAULT_SEEDS = [1, 2, 3, 4, 5]
+TARGETS = [1.0, 0.5]  # % gap to BKS
+
+# Unreached targets are scored as PAR10 (10x the budget), so failures rank as the slowest runs
+CENSOR_FACTOR = 10
+
+
+def time_to_target(history, bks, target):
+    """First (seconds, iteration) of the anytime curve within target% of the BKS, or None."""
+    limit = bks * (1.0 + target / 100.0)
+    for t, it, cost in history:
+        if cost <= limit + 1e-9:
+            return t, it
+    return None
+
+
+def run_one(path, seed, max_seconds, max_iterations, solver_kwargs):
+    """Solves one (instance, seed) pair and returns its convergence record."""
+    random.seed(seed)
+    inst = CVRPInstance(path)
+    solver = VNSSolver(inst, max_iterations=max_iterations, max_seconds=max_seconds,
+                       verbose=False, **solver_kwargs)
+    solution = solver.solve()
+
+    bks = read_bks(path)
+    record = {
+        "instance": instance_key(path),
+        "seed": seed,
+        "bks": bks,
+        "cost": round(solution.cost, 3),
+        "gap": round((solution.cost - bks) / bks * 100, 4) if bks else None,
+        "time": round(solver.elapsed, 3),
+        "iterations": solver.iterations,
+        # Anytime curve: [seconds, iteration, best cost] at every new best
+        "curve": [[round(t, 4), it, round(cost, 3)] for t, it, cost in solver.history],
+        "ttt": {},
+    }
+    if bks:
+        for target in TARGETS:
+            hit = time_to_target(solver.history, bks, target)
+            record["ttt"][str(target)] = {"time": round(hit[0], 4), "iter": hit[1]} if hit else None
+    return record
+
+
+def run_suite(instances, seeds, max_seconds, max_iterations, jobs, solver_kwargs):
+    tasks = [(path, seed) for path in instances for seed in seeds]
+    print(f"-> {len(tasks)} runs on {jobs} workers ({max_seconds}s / {max_iterations} iterations each)")
+    if jobs > 1:
+        print("   (Warning: concurrent runs share CPUs, wall-clock TTT is only comparable at equal --jobs)")
+
+    runs = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(run_one, path, seed, max_seconds, max_iterations, solver_kwargs): (path, seed)
+                   for path, seed in tasks}
+        for fut in as_completed(futures):
+            path, seed = futures[fut]
+            try:
+                rec = fut.result()
+            except Exception as e:
+                print(f"[FAIL] {path} (seed {seed}): {e}")
+                continue
+            runs.append(rec)
+            ttt = " ".join(f"{t}%={v['time']:.2f}s" if v else f"{t}%=--" for t, v in rec["ttt"].items())
+            print(f"[{len(runs)}/{len(tasks)}] {rec['instance']} seed={seed} gap={rec['gap']}% {ttt}")
+
+    runs.sort(key=lambda r: (r["instance"], r["seed"]))
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "max_seconds": max_seconds,
+            "max_iterations": max_iterations,
+            "seeds": list(seeds),
+            "jobs": jobs,
+            "targets": TARGETS,
+            "solver_kwargs": solver_kwargs,
+        },
+        "runs": runs,
+    }
+
+
+def save_results(path, results):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_results(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+# =========================================================================
+#  STATISTICS
+# =========================================================================
+def _mannwhitney_greater(x, y):
+    """
+    One-sided Mann-Whitney U p-value for "x tends to be larger than y".
+    Uses scipy when available, otherwise the normal approximation with tie
+    and continuity correction.
+    """
+    if HAS_SCIPY:
+        return float(mannwhitneyu(x, y, alternative="greater").pvalue)
+
+    n1, n2 = len(x), len(y)
+    pooled = sorted((v, i) for i, v in enumerate(list(x) + list(y)))
+    ranks = [0.0] * (n1 + n2)
+    tie_term = 0.0
+    i = 0
+    while i < len(pooled):
+        j = i
+        while j + 1 < len(pooled) and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[pooled[k][1]] = (i + j) / 2.0 + 1.0
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+
+    u = sum(ranks[:n1]) - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    var = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2.0 - 0.5) / math.sqrt(var)
+    return 0.5 * math.erfc(z / math.sqrt(2.0))
+
+
+def _median(values):
+    s = sorted(values)
+    m = len(s) // 2
+    return s[m] if len(s) % 2 else (s[m - 1] + s[m]) / 2.0
+
+
+def _metrics(results, censored):
+    """instance -> metric name -> list of per-seed values (lower is better)."""
+    out = {}
+    for r in results["runs"]:
+        if r["gap"] is None: continue
+        m = out.setdefault(r["instance"], {})
+        m.setdefault("gap", []).append(r["gap"])
+        for target, hit in r["ttt"].items():
+            value = hit["time"] if hit else censored
+            m.setdefault(f"ttt{target}", []).append(value)
+    return out
+
+
+def compare(baseline, current, alpha=0.05):
+    """Returns (rows, regressions) comparing per-instance metrics of two result files."""
+    if baseline["meta"]["max_seconds"] != current["meta"]["max_seconds"]:
+        print("Warning: Time budgets differ, TTT comparison is not meaningful.")
+    censored = CENSOR_FACTOR * max(baseline["meta"]["max_seconds"], current["meta"]["max_seconds"])
+    base_m, cur_m = _metrics(baseline, censored), _metrics(current, censored)
+
+    rows, regressions = [], []
+    for name in sorted(set(base_m) & set(cur_m)):
+        for metric in sorted(set(base_m[name]) & set(cur_m[name])):
+            b, c = base_m[name][metric], cur_m[name][metric]
+            p_worse = _mannwhitney_greater(c, b)
+            p_better = _mannwhitney_greater(b, c)
+            status = "REGRESSION" if p_worse < alpha else ("improved" if p_better < alpha else "")
+            row = (name, metric, _median(b), _median(c), min(p_worse, p_better), status)
+            rows.append(row)
+            if status == "REGRESSION":
+                regressions.append(row)
+    return rows, regressions
+
+
+def print_curves_summary(results):
+    budget = results["meta"]["max_seconds"]
+    by_instance = {}
+    for r in results["runs"]:
+        by_instance.setdefault(r["instance"], []).append(r)
+
+    header = f"{'Instance':<16}{'Runs':>6}{'Med Gap':>10}"
+    for t in TARGETS:
+        header += f"{f'Hit {t}%':>10}{f'Med TTT {t}%':>15}"
+    print("\n" + "=" * len(header))
+    print(header)
+    print("=" * len(header))
+    for name in sorted(by_instance):
+        runs = by_instance[name]
+        gaps = [r["gap"] for r in runs if r["gap"] is not None]
+        line = f"{name:<16}{len(runs):>6}" + (f"{_median(gaps):>9.2f}%" if gaps else f"{'n/a':>10}")
+        for t in TARGETS:
+            hits = [r["ttt"].get(str(t)) for r in runs]
+            reached = [h["time"] for h in hits if h]
+            # Median over all runs with PAR10 for misses, shown as ">budget" when it falls on a miss
+            med = _median([h["time"] if h else CENSOR_FACTOR * budget for h in hits]) if hits else None
+            med_str = "n/a" if med is None else (f">{budget}s" if med > budget else f"{med:.2f}s")
+            line += f"{len(reached):>6}/{len(runs):<3}{med_str:>15}"
+        print(line)
+    print("=" * len(header))
+
+
+def print_comparison(rows, alpha):
+    test = "scipy Mann-Whitney U" if HAS_SCIPY else "Mann-Whitney U (normal approx.)"
+    print(f"\nComparison vs baseline ({test}, one-sided, alpha={alpha}; TTT misses scored as PAR{CENSOR_FACTOR})")
+    print("=" * 74)
+    print(f"{'Instance':<16}{'Metric':<10}{'Baseline':>12}{'Current':>12}{'p':>10}  Status")
+    print("=" * 74)
+    for name, metric, b, c, p, status in rows:
+        print(f"{name:<16}{metric:<10}{b:>12.3f}{c:>12.3f}{p:>10.4f}  {status}")
+    print("=" * 74)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-target convergence benchmark with regression baselines")
+    parser.add_argument("instances", nargs="*", default=DEFAULT_INSTANCES, help="Instance files or glob patterns")
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS, help="Random seeds per instance")
+    parser.add_argument("--time", "-t", type=int, default=30, help="Max execution time per run")
+    parser.add_argument("--iter", type=int, default=1000000, help="Max iterations per run")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Parallel processes (1 keeps timings clean)")
+    parser.add_argument("--out", "-o", type=str, default="convergence_results.json", help="Results file")
+    parser.add_argument("--baseline", "-b", type=str, default=None, help="Baseline results file to compare against")
+    parser.add_argument("--compare-only", type=str, default=None,
+                        help="Skip solving and compare this results file against --baseline")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level for regressions")
+    parser.add_argument("--neighbors", "-k", type=int, default=30, help="Candidate list size (k nearest customers)")
+    parser.add_argument("--recreate", type=str, default="random", help="Recreate strategy")
+    parser.add_argument("--ruin", type=str, default="random", help="Ruin operators")
+    args = parser.parse_args()
+
+    if args.compare_only:
+        results = load_results(args.compare_only)
+    else:
+        instances = collect_instances(args.instances)
+        if not instances:
+            print("Error: No .vrp instances matched.")
+            sys.exit(1)
+        solver_kwargs = {"neighbor_k": args.neighbors, "recreate": args.recreate, "ruin": args.ruin}
+        results = run_suite(instances, args.seeds, args.time, args.iter, args.jobs, solver_kwargs)
+        save_results(args.out, results)
+        print(f"-> Results saved to {args.out}")
+
+    print_curves_summary(results)
+
+    if args.baseline:
+        rows, regressions = compare(load_results(args.baseline), results, args.alpha)
+        print_comparison(rows, args.alpha)
+        if regressions:
+            print(f"-> {len(regressions)} significant regression(s).")
+            sys.exit(1)
+        print("-> No significant regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from CVRP_Instance import CVRPInstance
+from initial_solution import CVRPSolution, CONSTRUCTIVE_HEURISTICS
+from solution_io import write_sol
+from vns_solver import VNSSolver
+
+
+# =========================================================================
+#  ROUTE PARTITIONING
+# =========================================================================
+def route_barycenters(solution):
+    coords = solution.instance.coord_array
+    return np.array([coords[route].mean(axis=0) for route in solution.routes])
+
+
+def partition_routes(solution, subproblem_size, method="angle", round_idx=0, seed=0):
+    """
+    Groups the routes of a solution into spatial clusters of about
+    subproblem_size customers and returns them as lists of route indices.
+
+    "angle" sorts the routes by the polar angle of their barycenter around the
+    depot and cuts the ring into consecutive groups; each round starts the cut
+    half a group further, so routes on a border end up together next round.
+    "kmeans" clusters the barycenters with Lloyd's algorithm, seeded per round.
+    """
+    if not solution.instance.has_coords:
+        raise ValueError(f"Route partitioning needs node coordinates, instance {solution.instance.name} has none.")
+    num_routes = len(solution.routes)
+    avg_len = sum(len(r) for r in solution.routes) / max(1, num_routes)
+    per_cluster = max(2, int(round(subproblem_size / max(1.0, avg_len))))
+    num_clusters = max(1, math.ceil(num_routes / per_cluster))
+    if num_clusters == 1:
+        return [list(range(num_routes))]
+
+    centers = route_barycenters(solution)
+    if method == "angle":
+        rel = centers - solution.instance.coord_array[solution.instance.depot_idx]
+        ring = np.argsort(np.arctan2(rel[:, 1], rel[:, 0]), kind='stable').tolist()
+        shift = (round_idx * max(1, per_cluster // 2)) % num_routes
+        ring = ring[shift:] + ring[:shift]
+        return [ring[i:i + per_cluster] for i in range(0, num_routes, per_cluster)]
+    if method == "kmeans":
+        return _kmeans_clusters(centers, num_clusters, np.random.default_rng(seed + round_idx))
+    raise ValueError(f"Unknown partition method '{method}'.")
+
+
+def _kmeans_clusters(points, k, rng, iterations=20):
+    # k-means++ seeding, then Lloyd iterations; empty clusters are dropped
+    centroids = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        d2 = ((points[:, None, :] - np.array(centroids)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        total = d2.sum()
+        idx = rng.choice(len(points), p=d2 / total) if total > 0 else rng.integers(len(points))
+        centroids.append(points[idx])
+    centroids = np.array(centroids)
+
+    labels = None
+    for _ in range(iterations):
+        new_labels = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        for c in range(k):
+            members = points[labels == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+
+    clusters = [np.flatnonzero(labels == c).tolist() for c in range(k)]
+    return [c for c in clusters if c]
+
+
+# =========================================================================
+#  SUBPROBLEMS
+# =========================================================================
+def build_subproblem(instance, routes, name):
+    """
+    Returns (sub_instance, node_map, sub_routes) for the customers of the given
+    routes plus the depot. node_map[i] is the parent index of sub node i; the
+    sub distance matrix is gathered from the parent, not recomputed.
+    """
+    node_map = sorted({instance.depot_idx} | {n for r in routes for n in r})
+    local = {n: i for i, n in enumerate(node_map)}
+    ids = [instance.nodes[n] for n in node_map]
+
+    matrix = None
+    if instance.dist_matrix is not None:
+        idx = np.array(node_map)
+        matrix = np.ascontiguousarray(instance.dist_matrix[np.ix_(idx, idx)])
+
+    sub = CVRPInstance.from_data(
+        name=name,
+        capacity=instance.capacity,
+        coords=zip(ids, map(tuple, instance.coord_array[node_map].tolist())),
+        demands=zip(ids, (instance.node_demands[n] for n in node_map)),
+        depot=instance.depot,
+        edge_weight_type=instance.edge_weight_type,
+        dist_matrix=matrix,
+    )
+    return sub, node_map, [[local[n] for n in r] for r in routes]
+
+
+def _solve_subproblem(sub, sub_routes, seed, max_seconds, max_iterations, solver_kwargs):
+    random.seed(seed)
+    solver = VNSSolver(sub, max_iterations=max_iterations, max_seconds=max_seconds, verbose=False,
+                       **solver_kwargs)
+    # Warm started from the cluster's own routes, so the result is never worse
+    best = solver.solve(CVRPSolution(sub, sub_routes))
+    return best.cost, best.routes
+
+
+# =========================================================================
+#  DRIVER
+# =========================================================================
+def solve_decomposed(instance, workers=1, seed=42, max_seconds=600, round_seconds=10.0, max_rounds=None,
+                     subproblem_size=200, method="angle", initial_solution=None, init="savings",
+                     checkpoint_path=None, checkpoint_interval=30.0, max_iterations=10 ** 9, target_cost=None,
+                     verbose=True, **solver_kwargs):
+    """
+    POPMUSIC-style decomposition: every round the incumbent's routes are
+    partitioned into spatial clusters, each cluster is solved as an
+    independent sub-CVRP by VNSSolver (in parallel processes when workers > 1)
+    and the improved routes replace the originals. Only moves between nearby
+    routes are ever tried, and memory per subproblem is bounded by
+    subproblem_size, so it scales to instances far beyond a single VNS.
+    Stops after max_seconds, max_rounds or once the cost reaches target_cost.
+    max_iterations and the remaining solver_kwargs (e.g. stall_limit) apply
+    to every subproblem solve. With checkpoint_path the incumbent is written
+    as a .sol file at most every checkpoint_interval seconds and at the end.
+    """
+    start = time.monotonic()
+    if not instance.neighbors:
+        instance.compute_neighbors(solver_kwargs.get("neighbor_k", 30))
+    if initial_solution is not None:
+        solution = initial_solution.clone()
+    else:
+        solution = CONSTRUCTIVE_HEURISTICS[init](
+            instance, should_stop=lambda: time.monotonic() - start >= max_seconds)
+    if verbose:
+        print(f"--> Initial Cost: {solution.cost:.2f} ({len(solution.routes)} routes)")
+
+    saved_cost = float('inf')
+    next_checkpoint = start + checkpoint_interval
+
+    def save_checkpoint():
+        nonlocal saved_cost
+        if solution.cost >= saved_cost - 0.001: return
+        try:
+            write_sol(checkpoint_path, solution)
+            saved_cost = solution.cost
+        except OSError as e:
+            print(f"Warning: Could not write checkpoint ({e}).")
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    round_idx = 0
+    try:
+        while max_rounds is None or round_idx < max_rounds:
+            remaining = max_seconds - (time.monotonic() - start)
+            if remaining <= 0.5: break
+            if target_cost is not None and solution.cost <= target_cost + 0.001: break
+            clusters = partition_routes(solution, subproblem_size, method, round_idx, seed)
+            # Subproblems run in waves of `workers`; the round as a whole fits round_seconds
+            waves = math.ceil(len(clusters) / workers)
+            budget = min(round_seconds, remaining) / waves
+            tasks = []
+            for c_idx, cluster in enumerate(clusters):
+                routes = [solution.routes[r] for r in cluster]
+                sub, node_map, sub_routes = build_subproblem(instance, routes, f"{instance.name}.r{round_idx}c{c_idx}")
+                args = (sub, sub_routes, seed + 1000 * round_idx + c_idx, budget, max_iterations, solver_kwargs)
+                tasks.append((cluster, node_map, pool.submit(_solve_subproblem, *args) if pool
+                              else _solve_subproblem(*args)))
+
+            new_routes = []
+            for cluster, node_map, result in tasks:
+                _, sub_best = result.result() if pool else result
+                new_routes.extend([node_map[i] for i in r] for r in sub_best if r)
+
+            cost_before = solution.cost
+            solution = CVRPSolution(instance, new_routes)
+            round_idx += 1
+            if verbose:
+                print(f"[{time.monotonic() - start:7.1f}s] Round {round_idx}: {len(clusters)} subproblems, "
+                      f"Cost {cost_before:.2f} -> {solution.cost:.2f}")
+            if checkpoint_path and time.monotonic() >= next_checkpoint:
+                next_checkpoint = time.monotonic() + checkpoint_interval
+                save_checkpoint()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if checkpoint_path:
+        save_checkpoint()
+    return solution
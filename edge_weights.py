@@ -0,0 +1,178 @@
+import numpy as np
+
+# EDGE_WEIGHT_FORMATs of EDGE_WEIGHT_TYPE: EXPLICIT. Every format but
+# FULL_MATRIX lists one triangle only, i.e. the weights are symmetric.
+EXPLICIT_FORMATS = ("FULL_MATRIX", "LOWER_ROW", "UPPER_ROW", "LOWER_DIAG_ROW", "UPPER_DIAG_ROW")
+
+INT32_MAX = np.iinfo(np.int32).max
+
+
+def _row_offsets(n):
+    # Start of row i in a packed lower triangle with diagonal: i * (i + 1) / 2
+    i = np.arange(n, dtype=np.int64)
+    return i * (i + 1) // 2
+
+
+class TriangularMatrix:
+    """
+    Symmetric n x n distance matrix stored as its packed lower triangle
+    (diagonal included), n * (n + 1) / 2 entries instead of n * n.
+
+    Indexing follows the parts of the ndarray interface the solver uses:
+    m[u] (one row), m[a:b] (a block of rows), m[u, v] and m[np.ix_(a, b)]
+    return plain ndarrays/scalars gathered from the triangle, and np.asarray(m)
+    expands the full matrix. rows() gives the row objects behind
+    CVRPInstance.dist_rows, so dist_rows[u][v] keeps working.
+    """
+
+    def __init__(self, data, n):
+        if len(data) != n * (n + 1) // 2:
+            raise ValueError(f"Packed triangle of a {n} x {n} matrix needs {n * (n + 1) // 2} entries, "
+                             f"got {len(data)}.")
+        self.data = data
+        self.n = n
+        self.offsets = _row_offsets(n)
+
+    @property
+    def shape(self):
+        return (self.n, self.n)
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __len__(self):
+        return self.n
+
+    def take(self, rows, cols):
+        """Entries (rows[k], cols[k]) for broadcastable index arrays."""
+        rows, cols = np.broadcast_arrays(np.asarray(rows), np.asarray(cols))
+        hi = np.maximum(rows, cols)
+        return self.data[self.offsets[hi] + np.minimum(rows, cols)]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, cols = key
+            if isinstance(rows, slice): rows = np.arange(self.n)[rows][:, None]
+            if isinstance(cols, slice): cols = np.arange(self.n)[cols][None, :]
+            return self.take(rows, cols)
+        rows = np.arange(self.n)[key]
+        if np.ndim(rows) == 0:
+            return self.take(rows, np.arange(self.n))
+        return self.take(rows[:, None], np.arange(self.n)[None, :])
+
+    def __array__(self, dtype=None, copy=None):
+        full = self[:]
+        return full.astype(dtype, copy=False) if dtype is not None else full
+
+    def rows(self):
+        flat = memoryview(self.data)
+        offsets = self.offsets.tolist()
+        return [TriangularRow(flat, offsets, u) for u in range(self.n)]
+
+
+class TriangularRow:
+    """Row u of a TriangularMatrix: row[v] is a plain int/float, like a memoryview row."""
+    __slots__ = ("head", "flat", "offsets", "u")
+
+    def __init__(self, flat, offsets, u):
+        # Entries (u, v <= u) are contiguous in the packed triangle, the rest sit in column u
+        self.head = flat[offsets[u]:offsets[u] + u + 1]
+        self.flat = flat
+        self.offsets = offsets
+        self.u = u
+
+    def __getitem__(self, v):
+        if v <= self.u:
+            return self.head[v]
+        return self.flat[self.offsets[v] + self.u]
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+class EdgeWeightReader:
+    """
+    Streaming parser for an EDGE_WEIGHT_SECTION. Lines are buffered and
+    converted in bulk (numpy text parsing) straight into the final storage:
+    a packed lower triangle for the symmetric formats, an n x n array for
+    FULL_MATRIX. Values start out as int32 and are widened to float64 only if
+    a non-integral or too large weight shows up.
+    """
+
+    def __init__(self, n, fmt, chunk_lines=4096):
+        fmt = fmt.upper()
+        if fmt not in EXPLICIT_FORMATS:
+            raise ValueError(f"Unsupported EDGE_WEIGHT_FORMAT '{fmt}' (expected one of {', '.join(EXPLICIT_FORMATS)}).")
+        self.n = n
+        self.fmt = fmt
+        self.chunk_lines = chunk_lines
+        self.expected = {
+            "FULL_MATRIX": n * n,
+            "LOWER_ROW": n * (n - 1) // 2,
+            "UPPER_ROW": n * (n - 1) // 2,
+            "LOWER_DIAG_ROW": n * (n + 1) // 2,
+            "UPPER_DIAG_ROW": n * (n + 1) // 2,
+        }[fmt]
+        size = n * n if fmt == "FULL_MATRIX" else n * (n + 1) // 2
+        self.data = np.zeros(size, dtype=np.int32)
+        self.count = 0
+        self._lines = []
+
+        # Position t of the stream lies in row row_starts.searchsorted(t, 'right') - 1
+        r = np.arange(n, dtype=np.int64)
+        if fmt == "LOWER_ROW":
+            self.row_starts = r * (r - 1) // 2
+        elif fmt == "UPPER_ROW":
+            self.row_starts = r * n - r * (r + 1) // 2
+        elif fmt == "UPPER_DIAG_ROW":
+            self.row_starts = r * n - r * (r - 1) // 2
+        self.offsets = _row_offsets(n)
+
+    def feed(self, line):
+        self._lines.append(line)
+        if len(self._lines) >= self.chunk_lines:
+            self._flush()
+
+    def _flush(self):
+        if not self._lines: return
+        text = " ".join(self._lines)
+        self._lines = []
+
+        is_float = any(c in text for c in ".eE")
+        values = np.fromstring(text, dtype=np.float64 if is_float else np.int64, sep=" ")
+        if len(values) == 0: return
+        if self.count + len(values) > self.expected:
+            raise ValueError(f"EDGE_WEIGHT_SECTION has more than the {self.expected} values "
+                             f"of a {self.n}-node {self.fmt}.")
+        if self.data.dtype != np.float64 and \
+                (values.dtype == np.float64 and (values != np.round(values)).any() or np.abs(values).max() > INT32_MAX):
+            self.data = self.data.astype(np.float64)
+
+        t = np.arange(self.count, self.count + len(values), dtype=np.int64)
+        self.data[self._destination(t)] = values
+        self.count += len(values)
+
+    def _destination(self, t):
+        # Maps stream positions to indices of the packed lower triangle (or the full matrix)
+        if self.fmt in ("FULL_MATRIX", "LOWER_DIAG_ROW"):
+            return t
+        row = self.row_starts.searchsorted(t, side='right') - 1
+        if self.fmt == "LOWER_ROW":
+            return t + row  # (row, col) with col < row; the skipped diagonal shifts row i by i
+        col = row + (t - self.row_starts[row]) + (1 if self.fmt == "UPPER_ROW" else 0)
+        return self.offsets[col] + row  # (row, col) with col >= row is stored as (col, row)
+
+    def finish(self):
+        """Returns the matrix: an ndarray for FULL_MATRIX, a TriangularMatrix otherwise."""
+        self._flush()
+        if self.count != self.expected:
+            raise ValueError(f"EDGE_WEIGHT_SECTION has {self.count} values, expected {self.expected} "
+                             f"for a {self.n}-node {self.fmt}.")
+        if self.fmt == "FULL_MATRIX":
+            return self.data.reshape(self.n, self.n)
+        return TriangularMatrix(self.data, self.n)
@@ -0,0 +1,195 @@
+from array import array
+from collections import deque
+
+import numpy as np
+
+
+class GiantTour:
+    """
+    Compact form of a solution: all customers in one flat array('i') (the
+    routes concatenated) plus route start offsets, so route r is
+    tour[offsets[r]:offsets[r + 1]]. Two flat int arrays copy, hash and
+    pickle far faster than a list of lists, which makes this the form used to
+    ship solutions between processes.
+
+    Iterating yields the routes as lists, so code written for
+    CVRPSolution.routes (e.g. [list(r) for r in routes]) accepts a GiantTour.
+    """
+    __slots__ = ("tour", "offsets")
+
+    def __init__(self, tour, offsets):
+        self.tour = tour if isinstance(tour, array) else array('i', tour)
+        self.offsets = offsets if isinstance(offsets, array) else array('i', offsets)
+
+    @classmethod
+    def from_routes(cls, routes):
+        tour = array('i')
+        offsets = array('i', [0])
+        for route in routes:
+            if not route: continue
+            tour.extend(route)
+            offsets.append(len(tour))
+        return cls(tour, offsets)
+
+    @classmethod
+    def from_solution(cls, solution):
+        return cls.from_routes(solution.routes)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        tour = self.tour
+        offsets = self.offsets
+        for r in range(len(offsets) - 1):
+            yield tour[offsets[r]:offsets[r + 1]].tolist()
+
+    def route(self, r):
+        return self.tour[self.offsets[r]:self.offsets[r + 1]].tolist()
+
+    def to_routes(self):
+        return list(self)
+
+    def __eq__(self, other):
+        return isinstance(other, GiantTour) and self.tour == other.tour and self.offsets == other.offsets
+
+    def __hash__(self):
+        return hash((self.tour.tobytes(), self.offsets.tobytes()))
+
+    def __repr__(self):
+        return f"GiantTour({len(self.tour)} customers, {len(self)} routes)"
+
+
+# =========================================================================
+#  SPLIT
+# =========================================================================
+def split(instance, tour):
+    """
+    Optimal partition of a fixed customer order into capacity-feasible routes
+    (Prins' Split, with the O(n) deque version of Vidal 2016, unlimited fleet).
+    Returns (GiantTour, cost).
+
+    p[j] is the cheapest cost of serving the first j customers. A route
+    serving customers i+1..j costs d(0, t_i+1) + (D[j] - D[i+1]) + d(t_j, 0),
+    with D the cumulated distance along the tour, so predecessor i contributes
+    g(i) = p[i] + d(0, t_i+1) - D[i+1] to any j. The deque keeps the
+    predecessors that are still feasible (load of i+1..j within capacity) in
+    increasing order of g; each customer is pushed and popped at most once.
+    """
+    n = len(tour)
+    if not n:
+        return GiantTour(array('i'), array('i', [0])), 0.0
+
+    D = instance.dist_rows
+    depot = instance.depot_idx
+    demands = instance.node_demands
+    capacity = instance.capacity
+    depot_row = D[depot]
+
+    # 1-based prefix arrays over the tour; index n + 1 only pads g(n)
+    to_depot = [0.0] * (n + 1)
+    from_depot = [0.0] * (n + 2)
+    cum_dist = [0.0] * (n + 2)
+    cum_load = [0] * (n + 2)
+    prev = None
+    for i, u in enumerate(tour, 1):
+        if demands[u] > capacity:
+            raise ValueError(f"Node {instance.nodes[u]} demand ({demands[u]}) exceeds vehicle capacity ({capacity}).")
+        from_depot[i] = depot_row[u]
+        to_depot[i] = D[u][depot]
+        cum_dist[i] = cum_dist[i - 1] + (D[prev][u] if prev is not None else 0)
+        cum_load[i] = cum_load[i - 1] + demands[u]
+        prev = u
+    cum_dist[n + 1] = cum_dist[n]
+    cum_load[n + 1] = cum_load[n]
+
+    p = [0.0] * (n + 1)
+    pred = [0] * (n + 1)
+    g = [0.0] * (n + 1)
+    g[0] = from_depot[1] - cum_dist[1]
+    queue = deque([0])
+
+    for j in range(1, n + 1):
+        front = queue[0]
+        p[j] = g[front] + cum_dist[j] + to_depot[j]
+        pred[j] = front
+        if j == n: break
+
+        g[j] = p[j] + from_depot[j + 1] - cum_dist[j + 1]
+        back = queue[-1]
+        # back dominates j when it is at least as good and stays feasible as long
+        if not (cum_load[back] == cum_load[j] and g[back] <= g[j]):
+            while queue and g[j] <= g[queue[-1]]:
+                queue.pop()
+            queue.append(j)
+        while cum_load[j + 1] - cum_load[queue[0]] > capacity:
+            queue.popleft()
+
+    starts = []
+    j = n
+    while j > 0:
+        starts.append(j)
+        j = pred[j]
+    starts.append(0)
+    starts.reverse()
+    return GiantTour(tour, starts), p[n]
+
+
+def route_order(solution):
+    """
+    Route indices in order of the polar angle of their barycenter around the
+    depot, so neighboring routes are adjacent in the giant tour. Instances
+    without coordinates keep the current order.
+    """
+    instance = solution.instance
+    routes = solution.routes
+    if not instance.has_coords or len(routes) < 2:
+        return list(range(len(routes)))
+    giant = GiantTour.from_routes(routes)
+    lengths = np.diff(np.frombuffer(giant.offsets, dtype=np.int32))
+    coords = instance.coord_array
+    centers = np.add.reduceat(coords[np.frombuffer(giant.tour, dtype=np.int32)], giant.offsets[:-1], axis=0)
+    centers = centers / lengths[:, None] - coords[instance.depot_idx]
+    nonempty = [r for r, route in enumerate(routes) if route]
+    return [nonempty[i] for i in np.argsort(np.arctan2(centers[:, 1], centers[:, 0]), kind='stable')]
+
+
+def split_improve(solution):
+    """
+    Re-optimizes the route boundaries of a solution: the routes are chained
+    in route_order() into one giant tour and re-split optimally. The current
+    boundaries are one feasible split of that tour, so the result is never
+    worse. Changed routes are written through set_route()/add_route(), which
+    keeps the undo log valid. Returns the cost improvement (0.0 if none).
+    """
+    routes = solution.routes
+    order = route_order(solution)
+    tour = array('i')
+    for r in order:
+        tour.extend(routes[r])
+
+    giant, cost = split(solution.instance, tour)
+    if cost >= solution.cost - 0.001:
+        return 0.0
+
+    # Routes that came out unchanged keep their index (and their list object)
+    before = solution.cost
+    node_route = solution.node_route
+    kept = set()
+    fresh = []
+    for route in giant:
+        r_idx = node_route[route[0]]
+        if routes[r_idx] == route:
+            kept.add(r_idx)
+        else:
+            fresh.append(route)
+
+    free = [r_idx for r_idx in range(len(routes)) if r_idx not in kept]
+    for r_idx, route in zip(free, fresh):
+        solution.set_route(r_idx, route)
+    for route in fresh[len(free):]:
+        solution.add_route(route)
+    for r_idx in free[len(fresh):]:
+        solution.set_route(r_idx, [])
+    solution.remove_empty_routes()
+    return before - solution.cost
@@ -1,74 +1,401 @@
+import heapq
 import sys
 
+import numpy as np
+
+from giant_tour import split
+
 
 class CVRPSolution:
     def __init__(self, instance, routes):
         self.instance = instance
+        # Routes hold dense node indices (instance.nodes[i] is the file ID).
+        # Route lists are copy-on-write: once stored they are never mutated in
+        # place, changes go through set_route()/insert()/add_route()/remove_nodes().
+        # That makes clone() and checkpoint() shallow and rollback() cheap.
         self.routes = routes
+
+        # Cached per-route state, kept in sync by the mutators below:
+        #   loads[r], route_costs[r]
+        #   prefix_loads[r][i] = load of routes[r][:i] (suffix load = loads[r] - prefix_loads[r][i])
+        #   node_route[n], node_pos[n] = where customer n currently sits (-1 if unassigned)
+        self.loads = []
+        self.route_costs = []
+        self.prefix_loads = []
+        self.node_route = []
+        self.node_pos = []
+        self.cost = 0.0
+        self._checkpoint = None
+        self.rebuild_state()
+
+    def rebuild_state(self):
+        self.loads = [0] * len(self.routes)
+        self.route_costs = [0.0] * len(self.routes)
+        self.prefix_loads = [None] * len(self.routes)
+        self.node_route = [-1] * self.instance.num_nodes
+        self.node_pos = [-1] * self.instance.num_nodes
+        self.cost = 0.0
+        for r_idx in range(len(self.routes)):
+            self.update_route(r_idx)
         self.cost = self.compute_total_cost()
 
+    def update_route(self, r_idx):
+        """Refreshes the cached state of one route after routes[r_idx] was replaced."""
+        route = self.routes[r_idx]
+        demands = self.instance.node_demands
+        node_route = self.node_route
+        node_pos = self.node_pos
+
+        acc = 0
+        prefix = [0]
+        for pos, n in enumerate(route):
+            acc += demands[n]
+            prefix.append(acc)
+            node_route[n] = r_idx
+            node_pos[n] = pos
+
+        new_cost = self.calculate_route_cost(self.instance, route)
+        self.cost += new_cost - self.route_costs[r_idx]
+        self.route_costs[r_idx] = new_cost
+        self.loads[r_idx] = acc
+        self.prefix_loads[r_idx] = prefix
+
+    def set_route(self, r_idx, route):
+        self.routes[r_idx] = route
+        self.update_route(r_idx)
+
+    def add_route(self, route):
+        self.routes.append(route)
+        self.loads.append(0)
+        self.route_costs.append(0.0)
+        self.prefix_loads.append(None)
+        self.update_route(len(self.routes) - 1)
+
+    def insert(self, r_idx, pos, node):
+        route = self.routes[r_idx]
+        self.set_route(r_idx, route[:pos] + [node] + route[pos:])
+
+    def remove_nodes(self, nodes):
+        """Unassigns a set of customers, refreshing only the routes that lost one."""
+        touched = {self.node_route[n] for n in nodes}
+        for r_idx in touched:
+            self.routes[r_idx] = [n for n in self.routes[r_idx] if n not in nodes]
+            self.update_route(r_idx)
+        for n in nodes:
+            self.node_route[n] = -1
+            self.node_pos[n] = -1
+        self.remove_empty_routes()
+
+    def remove_empty_routes(self):
+        if all(self.routes):
+            return
+        keep = [r_idx for r_idx, route in enumerate(self.routes) if route]
+        first_shifted = next(i for i, r_idx in enumerate(keep + [len(self.routes)]) if i != r_idx)
+
+        self.routes = [self.routes[r_idx] for r_idx in keep]
+        self.loads = [self.loads[r_idx] for r_idx in keep]
+        self.route_costs = [self.route_costs[r_idx] for r_idx in keep]
+        self.prefix_loads = [self.prefix_loads[r_idx] for r_idx in keep]
+
+        # Only routes behind the first removed one changed index
+        for r_idx in range(first_shifted, len(self.routes)):
+            for n in self.routes[r_idx]:
+                self.node_route[n] = r_idx
+
     def compute_total_cost(self):
-        total = 0.0
-        for route in self.routes:
-            total += self.calculate_route_cost(self.instance, route)
-        return total
+        # Sum of cached route costs; calculate_route_cost() walks a route from scratch
+        return sum(self.route_costs)
 
     @staticmethod
     def calculate_route_cost(instance, route):
         if not route: return 0.0
-        cost = 0.0
-        depot = instance.depot
-        cost += instance.distance(depot, route[0])
+        D = instance.dist_rows
+        depot = instance.depot_idx
+        cost = D[depot][route[0]]
         for i in range(len(route) - 1):
-            cost += instance.distance(route[i], route[i + 1])
-        cost += instance.distance(route[-1], depot)
+            cost += D[route[i]][route[i + 1]]
+        cost += D[route[-1]][depot]
         return cost
 
+    # --- UNDO LOG ---
+    # checkpoint() records the route-level arrays (O(#routes) references, the
+    # route lists themselves are shared thanks to copy-on-write). rollback()
+    # restores them and re-stamps the node maps only for routes that changed,
+    # so rejecting a candidate costs time proportional to what it modified.
+
+    def checkpoint(self):
+        self._checkpoint = (self.routes[:], self.loads[:], self.route_costs[:], self.prefix_loads[:], self.cost)
+
+    def commit(self):
+        self._checkpoint = None
+
+    def rollback(self):
+        routes, loads, route_costs, prefix_loads, cost = self._checkpoint
+        self._checkpoint = None
+
+        current = self.routes
+        node_route = self.node_route
+        node_pos = self.node_pos
+
+        # Every node that moved (or was unassigned) since the checkpoint came
+        # from a route whose list object changed, or whose index shifted when
+        # empty routes were dropped.
+        for r_idx, route in enumerate(routes):
+            if r_idx < len(current) and current[r_idx] is route: continue
+            for pos, n in enumerate(route):
+                node_route[n] = r_idx
+                node_pos[n] = pos
+
+        self.routes = routes
+        self.loads = loads
+        self.route_costs = route_costs
+        self.prefix_loads = prefix_loads
+        self.cost = cost
+
     def clone(self):
-        import copy
-        return CVRPSolution(self.instance, copy.deepcopy(self.routes))
+        sol = CVRPSolution.__new__(CVRPSolution)
+        sol.instance = self.instance
+        sol.routes = self.routes[:]
+        sol.loads = self.loads[:]
+        sol.route_costs = self.route_costs[:]
+        sol.prefix_loads = self.prefix_loads[:]
+        sol.node_route = self.node_route[:]
+        sol.node_pos = self.node_pos[:]
+        sol.cost = self.cost
+        sol._checkpoint = None
+        return sol
+
+
+# =========================================================================
+#  CONSTRUCTIVE HEURISTICS
+# =========================================================================
+def _check_demands(instance):
+    for u, demand in enumerate(instance.node_demands):
+        if u != instance.depot_idx and demand > instance.capacity:
+            raise ValueError(f"Node {instance.nodes[u]} demand ({demand}) exceeds vehicle capacity "
+                             f"({instance.capacity}).")
+
 
+# The O(n^2) constructors poll should_stop() every this many steps
+CONSTRUCT_CHECK_EVERY = 64
 
-def solve_nearest_neighbor(instance):
-    unvisited = set(instance.nodes)
-    if instance.depot in unvisited:
-        unvisited.remove(instance.depot)
+
+def solve_nearest_neighbor(instance, should_stop=None):
+    """
+    Nearest neighbor: extend the current route with the closest customer that
+    still fits (lowest index on ties), else return to the depot. Each step is
+    one vectorized pass over a distance matrix row. Once should_stop() is true
+    the remaining customers are appended in index order, filling routes up to
+    capacity, so the result is complete and feasible.
+    """
+    _check_demands(instance)
+    depot = instance.depot_idx
+    dist = instance.dist_matrix
+    demands = np.asarray(instance.node_demands)
+    capacity = instance.capacity
+
+    unvisited = np.ones(instance.num_nodes, dtype=bool)
+    unvisited[depot] = False
+    remaining = instance.num_nodes - 1
 
     routes = []
     current_route = []
     current_load = 0
-    current_loc = instance.depot
-
-    while unvisited:
-        best_node = None
-        min_dist = float('inf')
-        candidates = sorted(list(unvisited))
-
-        for candidate in candidates:
-            demand = instance.demands[candidate]
-            if current_load + demand <= instance.capacity:
-                dist = instance.distance(current_loc, candidate)
-                if dist < min_dist:
-                    min_dist = dist
-                    best_node = candidate
-
-        if best_node is not None:
+    current_loc = depot
+
+    steps = 0
+    while remaining:
+        steps += 1
+        if should_stop is not None and not steps % CONSTRUCT_CHECK_EVERY and should_stop():
+            for u in np.flatnonzero(unvisited).tolist():
+                if current_load + demands[u] > capacity:
+                    routes.append(current_route)
+                    current_route, current_load = [], 0
+                current_route.append(u)
+                current_load += int(demands[u])
+            break
+
+        feasible = unvisited & (demands <= capacity - current_load)
+        row = np.where(feasible, dist[current_loc], np.inf)
+        best_node = int(row.argmin())
+
+        if row[best_node] != np.inf:
             current_route.append(best_node)
-            current_load += instance.demands[best_node]
+            current_load += int(demands[best_node])
             current_loc = best_node
-            unvisited.remove(best_node)
+            unvisited[best_node] = False
+            remaining -= 1
         else:
-            if current_loc == instance.depot:
-                # This implies there is a customer with Demand > Capacity
-                raise ValueError("Instance contains a customer with demand > capacity, or NN failed.")
-
             # Close current route and return to depot
             routes.append(current_route)
             current_route = []
             current_load = 0
-            current_loc = instance.depot
+            current_loc = depot
 
     if current_route:
         routes.append(current_route)
 
-    return CVRPSolution(instance, routes)
\ No newline at end of file
+    return CVRPSolution(instance, routes)
+
+
+# Up to this many customers the savings list covers every pair; larger
+# instances only consider pairs from the neighbor lists (Toth & Vigo).
+SAVINGS_FULL_PAIRS_LIMIT = 200
+
+
+def solve_savings(instance, should_stop=None):
+    """
+    Clarke-Wright parallel savings. Pairs are popped from a heap by saving
+    s(i, j) = d(0, i) + d(0, j) - d(i, j); the merge joining i and j is taken if
+    both are route ends (fewer than two route neighbors), lie on different
+    routes (union-find) and the joined load fits.
+    """
+    _check_demands(instance)
+    depot = instance.depot_idx
+    D = instance.dist_rows
+    demands = instance.node_demands
+    capacity = instance.capacity
+    n = instance.num_nodes
+    customers = [u for u in range(n) if u != depot]
+
+    if len(customers) <= SAVINGS_FULL_PAIRS_LIMIT or not instance.neighbors:
+        cust = np.array(customers)
+        d0 = np.asarray(instance.dist_matrix[depot], dtype=np.float64)[cust]
+        sub = np.asarray(instance.dist_matrix, dtype=np.float64)[np.ix_(cust, cust)]
+        a, b = np.triu_indices(len(cust), k=1)
+        savings = d0[a] + d0[b] - sub[a, b]
+        keep = savings > 0
+        heap = list(zip((-savings[keep]).tolist(), cust[a[keep]].tolist(), cust[b[keep]].tolist()))
+    else:
+        d0 = D[depot]
+        pairs = {(min(u, v), max(u, v)) for u in customers for v in instance.neighbors[u]}
+        heap = [(-(d0[i] + d0[j] - D[i][j]), i, j) for i, j in pairs if d0[i] + d0[j] - D[i][j] > 0]
+    heapq.heapify(heap)
+
+    parent = list(range(n))
+    load = list(demands)
+    adj = [[] for _ in range(n)]
+
+    def find(u):
+        while parent[u] != u:
+            parent[u] = parent[parent[u]]
+            u = parent[u]
+        return u
+
+    merges_left = len(customers) - 1
+    while heap and merges_left:
+        _, i, j = heapq.heappop(heap)
+        if len(adj[i]) > 1 or len(adj[j]) > 1: continue
+        ri, rj = find(i), find(j)
+        if ri == rj or load[ri] + load[rj] > capacity: continue
+        parent[rj] = ri
+        load[ri] += load[rj]
+        adj[i].append(j)
+        adj[j].append(i)
+        merges_left -= 1
+
+    # Every route is a path: walk it from one of its ends
+    routes = []
+    placed = [False] * n
+    for u in customers:
+        if placed[u] or len(adj[u]) > 1: continue
+        route = []
+        prev, cur = -1, u
+        while cur != -1:
+            route.append(cur)
+            placed[cur] = True
+            nxt = -1
+            for v in adj[cur]:
+                if v != prev: nxt = v
+            prev, cur = cur, nxt
+        routes.append(route)
+
+    return CVRPSolution(instance, routes)
+
+
+def solve_sweep(instance, should_stop=None):
+    """
+    Polar sweep: customers sorted by angle around the depot, starting after the
+    widest angular gap, are cut into consecutive capacity-feasible clusters;
+    each cluster is then sequenced by nearest neighbor from the depot.
+    """
+    _check_demands(instance)
+    if not instance.has_coords:
+        raise ValueError(f"Sweep needs node coordinates, instance {instance.name} has none.")
+    depot = instance.depot_idx
+    D = instance.dist_rows
+    demands = instance.node_demands
+    capacity = instance.capacity
+    coords = instance.coord_array
+
+    customers = np.array([u for u in range(instance.num_nodes) if u != depot])
+    rel = coords[customers] - coords[depot]
+    angles = np.arctan2(rel[:, 1], rel[:, 0])
+    order = np.argsort(angles, kind='stable')
+    sorted_angles = angles[order]
+    gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * np.pi))
+    start = (int(gaps.argmax()) + 1) % len(order)
+    sweep = customers[np.roll(order, -start)].tolist()
+
+    clusters = []
+    cluster, cluster_load = [], 0
+    for u in sweep:
+        if cluster_load + demands[u] > capacity:
+            clusters.append(cluster)
+            cluster, cluster_load = [], 0
+        cluster.append(u)
+        cluster_load += demands[u]
+    if cluster:
+        clusters.append(cluster)
+
+    routes = []
+    for cluster in clusters:
+        route = []
+        left = set(cluster)
+        cur = depot
+        while left:
+            row = D[cur]
+            cur = min(left, key=lambda v: (row[v], v))
+            left.discard(cur)
+            route.append(cur)
+        routes.append(route)
+
+    return CVRPSolution(instance, routes)
+
+
+def solve_tour_split(instance, should_stop=None):
+    """
+    Route-first, cluster-second (Beasley / Prins): a nearest neighbor TSP tour
+    through all customers, ignoring capacity, is cut into routes by the
+    optimal linear-time Split (giant_tour.split). Once should_stop() is true
+    the tour continues through the remaining customers in index order.
+    """
+    _check_demands(instance)
+    depot = instance.depot_idx
+    dist = instance.dist_matrix
+
+    unvisited = np.ones(instance.num_nodes, dtype=bool)
+    unvisited[depot] = False
+    tour = []
+    current_loc = depot
+    for step in range(1, instance.num_nodes):
+        if should_stop is not None and not step % CONSTRUCT_CHECK_EVERY and should_stop():
+            tour.extend(np.flatnonzero(unvisited).tolist())
+            break
+        row = np.where(unvisited, dist[current_loc], np.inf)
+        current_loc = int(row.argmin())
+        unvisited[current_loc] = False
+        tour.append(current_loc)
+
+    giant, _ = split(instance, tour)
+    return CVRPSolution(instance, giant.to_routes())
+
+
+# Selectable via VNSSolver(init=...) and main.py --init. All take
+# (instance, should_stop=None); savings and sweep finish fast enough to ignore it.
+CONSTRUCTIVE_HEURISTICS = {
+    "nn": solve_nearest_neighbor,
+    "savings": solve_savings,
+    "sweep": solve_sweep,
+    "split": solve_tour_split,
+}
\ No newline at end of file
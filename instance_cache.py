@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from CVRP_Instance import CVRPInstance
+from edge_weights import TriangularMatrix
+from lazy_distances import LazyDistanceMatrix
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = ".cvrp_cache"
+
+
+def file_hash(filepath):
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _entry_dir(filepath, cache_dir, digest):
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), DEFAULT_CACHE_DIR)
+    base = os.path.splitext(os.path.basename(filepath))[0]
+    return cache_dir, base, os.path.join(cache_dir, f"{base}.{digest[:16]}")
+
+
+def load_instance(filepath, cache_dir=None, neighbor_k=30, lazy=None):
+    """
+    Returns the CVRPInstance for a .vrp file, served from an on-disk binary cache.
+
+    Each cache entry is a directory of .npy arrays (coordinates, demands,
+    distance matrix, neighbor lists) plus meta.json, keyed by the SHA-256 of
+    the source file, so editing the .vrp invalidates it. The distance matrix
+    and neighbor lists are memory-mapped read-only, so a warm start costs
+    milliseconds and concurrent processes share the same physical pages.
+    Instances with lazy distances (see CVRPInstance) store no matrix at all.
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"File not found: {filepath}")
+
+    digest = file_hash(filepath)
+    cache_dir, base, entry = _entry_dir(filepath, cache_dir, digest)
+
+    inst = _read_entry(entry, digest, filepath, neighbor_k, lazy)
+    if inst is not None:
+        return inst
+
+    inst = CVRPInstance(filepath, lazy=lazy)
+    inst.compute_neighbors(neighbor_k)
+    try:
+        _write_entry(inst, cache_dir, base, entry, digest)
+    except OSError as e:
+        # A read-only instance directory should not prevent solving
+        print(f"Warning: Could not write instance cache ({e}).")
+        return inst
+
+    # Re-open from the cache so this process maps the same pages as later ones
+    return _read_entry(entry, digest, filepath, neighbor_k, lazy) or inst
+
+
+def _read_entry(entry, digest, filepath, neighbor_k, lazy=None):
+    meta_path = os.path.join(entry, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get("version") != CACHE_VERSION or meta.get("source_hash") != digest:
+            return None
+
+        node_ids = np.load(os.path.join(entry, "nodes.npy"))
+        coords = np.load(os.path.join(entry, "coords.npy"))
+        demands = np.load(os.path.join(entry, "demands.npy"))
+
+        # Lazy distances come from the coordinates; an entry without a matrix
+        # cannot serve a dense request
+        storage = meta.get("dist_storage")
+        use_lazy = meta["edge_weight_type"] != "EXPLICIT" and (storage == "lazy" if lazy is None else lazy)
+        if storage == "lazy" and not use_lazy:
+            return None
+        dist = None
+        if not use_lazy:
+            dist = np.load(os.path.join(entry, "dist.npy"), mmap_mode='r')
+            if storage == "triangular":
+                dist = TriangularMatrix(dist, len(node_ids))
+        neighbors = np.load(os.path.join(entry, "neighbors.npy"), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+
+    ids = node_ids.tolist()
+    inst = CVRPInstance.from_data(
+        name=meta["name"],
+        capacity=meta["capacity"],
+        coords=zip(ids, map(tuple, coords.tolist())),
+        demands=zip(ids, demands.tolist()),
+        depot=meta["depot"],
+        edge_weight_type=meta["edge_weight_type"],
+        dist_matrix=dist,
+        filepath=filepath,
+        lazy=use_lazy,
+    )
+
+    # Cached lists are sorted by distance, so any k up to the cached one is a prefix
+    if neighbor_k <= meta["neighbor_k"]:
+        k = neighbor_k
+        inst.neighbors = [row[:k].tolist() if i != inst.depot_idx else [] for i, row in enumerate(neighbors)]
+        inst.neighbor_k = k
+    else:
+        # Release the mapping before the file is replaced
+        del neighbors
+        inst.compute_neighbors(neighbor_k)
+        try:
+            _widen_neighbors(inst, entry, meta)
+        except OSError as e:
+            print(f"Warning: Could not update instance cache ({e}).")
+    return inst
+
+
+def _neighbor_array(inst):
+    neighbors = np.full((inst.num_nodes, inst.neighbor_k), -1, dtype=np.int32)
+    for i, row in enumerate(inst.neighbors):
+        neighbors[i, :len(row)] = row
+    return neighbors
+
+
+def _widen_neighbors(inst, entry, meta):
+    """Rewrites an entry's neighbor lists with the larger k just computed, so later loads are warm."""
+    # neighbors.npy first: a reader holding the old meta only uses a prefix of the new lists
+    fd, tmp = tempfile.mkstemp(prefix=".neighbors.", suffix=".npy", dir=entry)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, _neighbor_array(inst))
+        os.replace(tmp, os.path.join(entry, "neighbors.npy"))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    meta = dict(meta, neighbor_k=inst.neighbor_k)
+    fd, tmp = tempfile.mkstemp(prefix=".meta.", suffix=".json", dir=entry)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(entry, "meta.json"))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_entry(inst, cache_dir, base, entry, digest):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{base}.", dir=cache_dir)
+    try:
+        neighbors = _neighbor_array(inst)
+
+        np.save(os.path.join(tmp, "nodes.npy"), np.array(inst.nodes, dtype=np.int64))
+        np.save(os.path.join(tmp, "coords.npy"), inst.coord_array)
+        np.save(os.path.join(tmp, "demands.npy"), np.array(inst.node_demands, dtype=np.int64))
+        # Symmetric EXPLICIT matrices keep their packed triangle
+        packed = isinstance(inst.dist_matrix, TriangularMatrix)
+        lazy = isinstance(inst.dist_matrix, LazyDistanceMatrix)
+        if not lazy:
+            np.save(os.path.join(tmp, "dist.npy"), inst.dist_matrix.data if packed else np.ascontiguousarray(inst.dist_matrix))
+        np.save(os.path.join(tmp, "neighbors.npy"), neighbors)
+
+        # meta.json last: an entry without it is never read
+        meta = {
+            "version": CACHE_VERSION,
+            "source_hash": digest,
+            "name": inst.name,
+            "capacity": inst.capacity,
+            "depot": inst.depot,
+            "edge_weight_type": inst.edge_weight_type,
+            "dimension": inst.dimension,
+            "dist_storage": "triangular" if packed else ("lazy" if lazy else "full"),
+            "neighbor_k": inst.neighbor_k,
+        }
+        with open(os.path.join(tmp, "meta.json"), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        # Drop stale entries of the same instance, then publish atomically
+        for name in os.listdir(cache_dir):
+            if name.startswith(base + ".") and os.path.join(cache_dir, name) != entry \
+                    and not name.startswith("."):
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.rename(tmp, entry)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
@@ -0,0 +1,76 @@
+import json
+import time
+
+
+class SearchStats:
+    """
+    Opt-in instrumentation for VNSSolver.
+
+    Collects per-operator counters (calls, evaluated moves, accepted moves,
+    cumulative cost delta, wall time) and per-iteration shake / local search
+    timings. If trace_path is given, every record is also appended to a JSONL
+    trace file as it happens.
+    """
+
+    def __init__(self, trace_path=None):
+        self.operators = {}
+        self.iterations = 0
+        self.shake_time = 0.0
+        self.ls_time = 0.0
+        self.start_time = time.perf_counter()
+        self._trace = open(trace_path, 'w') if trace_path else None
+
+    def record_operator(self, name, elapsed, evaluated, accepted, delta):
+        op = self.operators.get(name)
+        if op is None:
+            op = self.operators[name] = {"calls": 0, "evaluated": 0, "accepted": 0, "delta": 0.0, "time": 0.0}
+        op["calls"] += 1
+        op["evaluated"] += evaluated
+        op["accepted"] += accepted
+        op["delta"] += delta
+        op["time"] += elapsed
+
+    def record_iteration(self, iteration, shake_time, ls_time, candidate_cost, current_cost, best_cost):
+        self.iterations = iteration
+        self.shake_time += shake_time
+        self.ls_time += ls_time
+        self._write({
+            "type": "iteration",
+            "iter": iteration,
+            "t": round(time.perf_counter() - self.start_time, 6),
+            "shake_time": round(shake_time, 6),
+            "ls_time": round(ls_time, 6),
+            "candidate": candidate_cost,
+            "current": current_cost,
+            "best": best_cost,
+        })
+
+    def close(self):
+        if self._trace is not None:
+            self._write({"type": "summary", "iterations": self.iterations, "operators": self.operators,
+                         "shake_time": self.shake_time, "ls_time": self.ls_time})
+            self._trace.close()
+            self._trace = None
+
+    def _write(self, record):
+        if self._trace is not None:
+            self._trace.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        total = sum(op["time"] for op in self.operators.values()) or 1.0
+        lines = [
+            "=" * 86,
+            f"{'Operator':<12}{'Calls':>9}{'Evaluated':>13}{'Accepted':>10}{'Acc %':>8}"
+            f"{'Delta':>14}{'Time (s)':>11}{'Time %':>9}",
+            "=" * 86,
+        ]
+        for name, op in self.operators.items():
+            acc_pct = 100.0 * op["accepted"] / op["calls"] if op["calls"] else 0.0
+            lines.append(
+                f"{name:<12}{op['calls']:>9}{op['evaluated']:>13}{op['accepted']:>10}{acc_pct:>7.1f}%"
+                f"{op['delta']:>14.2f}{op['time']:>11.3f}{100.0 * op['time'] / total:>8.1f}%"
+            )
+        lines.append("=" * 86)
+        lines.append(f"Iterations: {self.iterations} | Shake: {self.shake_time:.3f}s | "
+                     f"Local Search: {self.ls_time:.3f}s")
+        return "\n".join(lines)
@@ -0,0 +1,201 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_KDTREE = True
+except ImportError:
+    HAS_KDTREE = False
+
+# Coordinate instances above this many nodes default to lazy distances
+# (a dense int32 matrix of 20000 nodes already takes 1.6 GB)
+LAZY_AUTO_NODES = 20000
+
+# Memory budget of the hot row cache
+DEFAULT_ROW_CACHE_BYTES = 256 << 20
+
+
+class LazyDistanceMatrix:
+    """
+    Distance matrix of a coordinate instance that is never materialized:
+    entries are computed from the coordinates when asked for, so memory grows
+    linearly with the number of nodes. Rounding follows the dense matrix
+    (EUC_2D: nearest integer, int32; otherwise float64).
+
+    rows() gives the row objects behind CVRPInstance.dist_rows. A row whose
+    entries are looked up often is computed in full once and kept in a
+    bounded cache of hot rows (the depot row always is), after which its
+    lookups are plain memoryview reads. The cache evicts with the CLOCK
+    (second chance) approximation of LRU, so a cached lookup costs one flag
+    store instead of an OrderedDict reordering.
+
+    Indexing mirrors TriangularMatrix: m[u], m[a:b], m[u, v] and
+    m[np.ix_(a, b)] return ndarrays computed on the fly.
+    """
+
+    def __init__(self, coords, rounded=True, cache_bytes=DEFAULT_ROW_CACHE_BYTES, depot=None):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64)
+        self.n = len(self.coords)
+        self.rounded = rounded
+        self._dtype = np.dtype(np.int32 if rounded else np.float64)
+        self.cache_rows = max(1, min(self.n, cache_bytes // max(1, self.n * self._dtype.itemsize)))
+        # Misses after which a row is computed in full: by then the per-entry
+        # lookups have cost about as much as the vectorized row (ski rental)
+        self.promote_after = max(16, self.n // 64)
+        self.depot = depot
+        self._init_rows()
+
+    def _init_rows(self):
+        self._xs = self.coords[:, 0].tolist()
+        self._ys = self.coords[:, 1].tolist()
+        self._rows = [LazyRow(self, u) for u in range(self.n)]
+        self._cached = OrderedDict()
+        self.promotions = 0
+        if self.depot is not None:
+            self._rows[self.depot].cached = self._cache_row(self.depot)
+
+    def __getstate__(self):
+        # Rows and the cache are rebuilt from the coordinates after unpickling
+        return {"coords": self.coords, "rounded": self.rounded, "_dtype": self._dtype,
+                "cache_rows": self.cache_rows, "promote_after": self.promote_after, "depot": self.depot,
+                "n": self.n}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_rows()
+
+    @property
+    def shape(self):
+        return (self.n, self.n)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def nbytes(self):
+        # Coordinates plus the cached rows; the full matrix is never stored
+        return self.coords.nbytes + (len(self._cached) + (self.depot is not None)) * self.n * self._dtype.itemsize
+
+    def __len__(self):
+        return self.n
+
+    def take(self, rows, cols):
+        """Entries (rows[k], cols[k]) for broadcastable index arrays."""
+        rows, cols = np.broadcast_arrays(np.asarray(rows), np.asarray(cols))
+        diff = self.coords[rows] - self.coords[cols]
+        dist = np.sqrt(diff[..., 0] * diff[..., 0] + diff[..., 1] * diff[..., 1])
+        if self.rounded:
+            return np.floor(dist + 0.5).astype(np.int32)
+        return dist
+
+    def _compute_row(self, u):
+        return self.take(u, np.arange(self.n))
+
+    def _cache_row(self, u):
+        row = self._compute_row(u)
+        row.flags.writeable = False
+        return memoryview(row)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            rows, cols = key
+            if isinstance(rows, slice): rows = np.arange(self.n)[rows][:, None]
+            if isinstance(cols, slice): cols = np.arange(self.n)[cols][None, :]
+            return self.take(rows, cols)
+        rows = np.arange(self.n)[key]
+        if np.ndim(rows) == 0:
+            # A single row read as a whole is not hot by itself; served from the cache if there
+            cached = self._rows[int(rows)].cached
+            return np.asarray(cached) if cached is not None else self._compute_row(rows)
+        return self.take(rows[:, None], np.arange(self.n)[None, :])
+
+    def __array__(self, dtype=None, copy=None):
+        full = self[:]
+        return full.astype(dtype, copy=False) if dtype is not None else full
+
+    def rows(self):
+        return self._rows
+
+    def _promote(self, row):
+        cached = self._cached
+        while len(cached) >= self.cache_rows:
+            # Second chance: rows used since they were last passed over stay
+            u, victim = cached.popitem(last=False)
+            if victim.used:
+                victim.used = False
+                cached[u] = victim
+            else:
+                victim.cached = None
+                victim.misses = 0
+        row.cached = self._cache_row(row.u)
+        row.used = False
+        cached[row.u] = row
+        self.promotions += 1
+        return row.cached
+
+    def nearest_neighbors(self, k, exclude):
+        """
+        k nearest nodes of every node (closest first by stored distance, ties
+        by node index, the node itself and exclude left out) from a KD-tree
+        instead of a scan of every row. Requires scipy.
+        """
+        n = self.n
+        tree = cKDTree(self.coords)
+        neighbors = [[] for _ in range(n)]
+        nodes = np.array([u for u in range(n) if u != exclude], dtype=np.int64)
+        m = min(n, k + 2)
+        block = max(1, (1 << 20) // m)
+        for start in range(0, len(nodes), block):
+            todo = nodes[start:start + block]
+            _, found = tree.query(self.coords[todo], k=m)
+            found = np.asarray(found).reshape(len(todo), m)
+            dist = self.take(todo[:, None], found).astype(np.float64)
+            dist[(found == todo[:, None]) | (found == exclude)] = np.inf
+            kth = np.sort(dist, axis=1)[:, k - 1]
+
+            # Every node at the k-th stored distance or closer lies in this ball
+            # (rounded distances hide up to 0.5), so ties are resolved exactly
+            radius = (kth + 0.5 if self.rounded else kth) * (1 + 1e-9) + 1e-9
+            for u, ball in zip(todo.tolist(), tree.query_ball_point(self.coords[todo], radius)):
+                ball = np.array(ball, dtype=np.int64)
+                ball = ball[(ball != u) & (ball != exclude)]
+                order = np.lexsort((ball, self.take(u, ball)))[:k]
+                neighbors[u] = ball[order].tolist()
+        return neighbors
+
+
+class LazyRow:
+    """Row u of a LazyDistanceMatrix: row[v] is a plain int/float, like a memoryview row."""
+    __slots__ = ("matrix", "u", "x", "y", "xs", "ys", "rounded", "cached", "misses", "used")
+
+    def __init__(self, matrix, u):
+        self.matrix = matrix
+        self.u = u
+        self.xs = matrix._xs
+        self.ys = matrix._ys
+        self.x = self.xs[u]
+        self.y = self.ys[u]
+        self.rounded = matrix.rounded
+        self.cached = None
+        self.misses = 0
+        self.used = False
+
+    def __getitem__(self, v):
+        cached = self.cached
+        if cached is not None:
+            self.used = True
+            return cached[v]
+        self.misses += 1
+        if self.misses >= self.matrix.promote_after:
+            return self.matrix._promote(self)[v]
+        dx = self.x - self.xs[v]
+        dy = self.y - self.ys[v]
+        # Same operations as take(), so cached and computed entries agree bit for bit
+        d = math.sqrt(dx * dx + dy * dy)
+        return int(d + 0.5) if self.rounded else d
+
+    def __len__(self):
+        return self.matrix.n
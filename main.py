@@ -7,6 +7,12 @@ import time
 try:
     from CVRP_Instance import CVRPInstance
     from vns_solver import VNSSolver
+    from parallel_vns import solve_parallel
+    from instrumentation import SearchStats
+    from instance_cache import load_instance
+    from lazy_distances import LazyDistanceMatrix
+    from solution_io import solution_from_sol
+    from decomposition import solve_decomposed
 except ImportError as e:
     print(f"Critical Error: Missing modules. {e}")
     sys.exit(1)
@@ -37,9 +43,56 @@ def main():
     parser.add_argument("--instance", "-i", type=str, help="Path to the .vrp input file")
     parser.add_argument("--seed", "-s", type=int, default=42, help="Random seed")
     parser.add_argument("--time", "-t", type=int, default=600, help="Max execution time")
-    parser.add_argument("--iter", type=int, default=2000, help="Max iterations")
+    parser.add_argument("--iter", type=int, default=2000, help="Max iterations (per subproblem and round with --decompose)")
+    parser.add_argument("--target-gap", type=float, default=None,
+                        help="Stop once the best solution is within this %% of the BKS (.sol file)")
+    parser.add_argument("--stall", type=int, default=None,
+                        help="Stop after this many iterations without a new best (per subproblem with --decompose)")
     parser.add_argument("--plot", "-p", action="store_true", help="Visualize solution")
+    parser.add_argument("--neighbors", "-k", type=int, default=30, help="Candidate list size (k nearest customers)")
+    parser.add_argument("--granularity", type=float, default=None,
+                        help="Granular threshold beta (drop candidate arcs longer than beta * avg arc)")
+    parser.add_argument("--recreate", type=str, default="random", choices=["random", "greedy", "regret2", "regret3"],
+                        help="Recreate strategy after ruin")
+    parser.add_argument("--init", type=str, default="nn", choices=["nn", "savings", "sweep", "split"],
+                        help="Initial solution heuristic (nearest neighbor, Clarke-Wright savings, polar sweep, tour + Split)")
+    parser.add_argument("--ruin", type=str, default="random",
+                        help="Ruin operators with optional weights, e.g. 'sisr' or 'sisr:3,radial,shaw' "
+                             "(random, radial, route, sisr, shaw); with --adaptive the weights scale "
+                             "the learned selection weights")
+    parser.add_argument("--pair-moves", action="store_true",
+                        help="Add exhaustive relocate/swap between neighboring routes (numpy-evaluated) to the VND")
+    parser.add_argument("--ls-cache", type=int, default=10000,
+                        help="Size of the visited local optima LRU cache (0 disables)")
+    parser.add_argument("--split", action="store_true",
+                        help="Re-optimize route boundaries after every recreate with the linear-time Split")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Adaptive roulette over VND operators and ruin settings, weighted by improvement per second")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Parallel VNS islands (distinct seeds)")
+    parser.add_argument("--exchange", type=float, default=10.0,
+                        help="Seconds between elite exchanges between islands (0 = independent multi-start)")
+    parser.add_argument("--decompose", type=str, default=None, choices=["angle", "kmeans"],
+                        help="Decomposition mode: solve route clusters (by barycenter angle or k-means) as "
+                             "independent sub-CVRPs on --workers processes")
+    parser.add_argument("--subproblem-size", type=int, default=200, help="Customers per decomposition subproblem")
+    parser.add_argument("--round-time", type=float, default=10.0, help="Seconds per decomposition round")
+    parser.add_argument("--distances", type=str, default="auto", choices=["auto", "dense", "lazy"],
+                        help="Distance storage of coordinate instances: dense matrix, computed on demand with "
+                             "a hot row cache and KD-tree neighbor lists, or lazy only for very large instances")
+    parser.add_argument("--cache", action="store_true",
+                        help="Load the instance from a binary cache (built on first use)")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Cache directory (default: .cvrp_cache next to the instance)")
+    parser.add_argument("--warm-start", type=str, default=None,
+                        help="Start from an existing .sol solution (e.g. a previous run or checkpoint)")
+    parser.add_argument("--checkpoint", type=str, default=None,
+                        help="Periodically write the best solution to this .sol file")
+    parser.add_argument("--checkpoint-interval", type=float, default=30.0, help="Seconds between checkpoints")
+    parser.add_argument("--stats", action="store_true", help="Print per-operator statistics at the end")
+    parser.add_argument("--trace", type=str, default=None, help="Write a JSONL search trace to this file")
     args = parser.parse_args()
+    if args.neighbors < 1:
+        parser.error("--neighbors must be at least 1")
 
     if args.seed is not None:
         random.seed(args.seed)
@@ -55,14 +108,83 @@ def main():
         sys.exit(1)
 
     print(f"-> Solving: {target_file}")
+    lazy = {"auto": None, "dense": False, "lazy": True}[args.distances]
 
     try:
-        inst = CVRPInstance(target_file)
+        t_load = time.time()
+        if args.cache or args.cache_dir:
+            inst = load_instance(target_file, cache_dir=args.cache_dir, neighbor_k=args.neighbors, lazy=lazy)
+        else:
+            inst = CVRPInstance(target_file, lazy=lazy)
+        print(f"-> Loaded in {time.time() - t_load:.3f}s")
+        if isinstance(inst.dist_matrix, LazyDistanceMatrix):
+            print(f"-> Lazy distances: {inst.dist_matrix.cache_rows} cached rows at most")
         bks = read_bks(target_file)
         if bks: print(f"-> BKS: {bks}")
 
-        solver = VNSSolver(inst, max_iterations=args.iter, max_seconds=args.time)
-        solution = solver.solve()
+        target_cost = None
+        if args.target_gap is not None:
+            if bks:
+                target_cost = bks * (1 + args.target_gap / 100)
+                print(f"-> Target: {target_cost:.2f} ({args.target_gap}% gap)")
+            else:
+                print("Warning: --target-gap ignored, no BKS found.")
+
+        initial = None
+        if args.warm_start:
+            initial = solution_from_sol(inst, args.warm_start)
+            print(f"-> Warm start: {args.warm_start} (cost {initial.cost:.2f}, {len(initial.routes)} routes)")
+
+        if args.decompose:
+            print(f"-> Decomposition ({args.decompose}): ~{args.subproblem_size} customers per subproblem, "
+                  f"{args.workers} workers")
+            solution = solve_decomposed(inst, workers=args.workers, seed=args.seed, max_seconds=args.time,
+                                        round_seconds=args.round_time, subproblem_size=args.subproblem_size,
+                                        method=args.decompose, initial_solution=initial, init=args.init,
+                                        checkpoint_path=args.checkpoint, target_cost=target_cost,
+                                        checkpoint_interval=args.checkpoint_interval,
+                                        max_iterations=args.iter, stall_limit=args.stall,
+                                        neighbor_k=args.neighbors,
+                                        granular_beta=args.granularity, recreate=args.recreate, ruin=args.ruin,
+                                        pair_moves=args.pair_moves, ls_cache_size=args.ls_cache,
+                                        adaptive=args.adaptive, split=args.split)
+        elif args.workers > 1:
+            if args.stats or args.trace:
+                print("Warning: --stats and --trace are only recorded by a single process; ignored with --workers > 1.")
+            print(f"-> Parallel VNS: {args.workers} islands, seeds {args.seed}..{args.seed + args.workers - 1}")
+            solution = solve_parallel(inst, args.workers, seed=args.seed, max_iterations=args.iter,
+                                      max_seconds=args.time, exchange_interval=args.exchange,
+                                      initial_solution=initial, checkpoint_path=args.checkpoint,
+                                      checkpoint_interval=args.checkpoint_interval,
+                                      neighbor_k=args.neighbors, granular_beta=args.granularity,
+                                      recreate=args.recreate, ruin=args.ruin, init=args.init,
+                                      pair_moves=args.pair_moves, target_cost=target_cost,
+                                      stall_limit=args.stall, ls_cache_size=args.ls_cache,
+                                      adaptive=args.adaptive, split=args.split)
+        else:
+            stats = SearchStats(trace_path=args.trace) if (args.stats or args.trace) else None
+            solver = VNSSolver(inst, max_iterations=args.iter, max_seconds=args.time,
+                               neighbor_k=args.neighbors, granular_beta=args.granularity, stats=stats,
+                               recreate=args.recreate, ruin=args.ruin, init=args.init, checkpoint_path=args.checkpoint,
+                               checkpoint_interval=args.checkpoint_interval, pair_moves=args.pair_moves,
+                               target_cost=target_cost, stall_limit=args.stall, ls_cache_size=args.ls_cache,
+                               adaptive=args.adaptive, split=args.split)
+            try:
+                solution = solver.solve(initial)
+            finally:
+                if stats is not None:
+                    stats.close()
+            if stats is not None:
+                print("\n" + stats.summary())
+            print(f"-> Stopped by: {solver.stop_reason} after {solver.iterations} iterations ({solver.elapsed:.2f}s)")
+            if solver.ls_cache is not None:
+                cache = solver.ls_cache
+                print(f"-> Local optima cache: {cache.hits}/{cache.lookups} hits ({100 * cache.hit_rate:.1f}%), "
+                      f"{len(cache)} states")
+            if args.adaptive:
+                print("\n-> Adaptive weights (weight, uses, improvement/s)")
+                print(solver.operator_schedule.summary())
+                print(solver.ruin_schedule.summary(label=lambda o: f"{o[0]}@{int(o[1] * 100)}%"))
 
         print("\n" + "=" * 30)
         print("       FINAL RESULTS       ")
@@ -0,0 +1,284 @@
+import argparse
+import math
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+from CVRP_Instance import CVRPInstance
+from convergence_benchmark import _median, load_results, save_results
+from initial_solution import solve_sweep
+from vns_solver import VNSSolver
+
+# Synthetic scaling grid: customers, layouts and average customers per route
+DEFAULT_SIZES = [100, 200, 500, 1000, 2000, 5000]
+LAYOUTS = ["uniform", "clustered"]
+DEFAULT_ROUTE_LENGTHS = [10, 50]
+
+# VND neighborhoods by their VNSSolver.operators name, plus the recreate insertion
+OPERATORS = ["2opt", "2opt*", "relocate1", "relocate2", "swap", "insertion"]
+
+GRID = 1000  # coordinates in [0, GRID]^2, depot in the middle
+
+
+# =========================================================================
+#  SYNTHETIC INSTANCES
+# =========================================================================
+def make_instance(num_customers, layout="uniform", route_len=10, seed=0):
+    """
+    In-memory CVRPInstance with num_customers customers on a GRID x GRID
+    square: "uniform" draws integer coordinates uniformly, "clustered" around
+    a few random centers (about one per 100 customers, at least 3). Demands
+    are uniform in 1..10 and the capacity is set so routes serve route_len
+    customers on average. The same arguments always give the same instance.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}' (expected one of {', '.join(LAYOUTS)}).")
+    rng = np.random.default_rng([seed, num_customers, route_len, LAYOUTS.index(layout)])
+
+    if layout == "uniform":
+        points = rng.integers(0, GRID + 1, size=(num_customers, 2))
+    else:
+        centers = rng.uniform(0, GRID, size=(max(3, num_customers // 100), 2))
+        owner = rng.integers(0, len(centers), size=num_customers)
+        points = centers[owner] + rng.normal(0, GRID / 30, size=(num_customers, 2))
+        points = np.clip(np.rint(points), 0, GRID).astype(int)
+    demands = rng.integers(1, 11, size=num_customers)
+    capacity = max(int(demands.max()), int(math.ceil(route_len * demands.mean())))
+
+    coords = {1: (GRID // 2, GRID // 2)}
+    coords.update({i + 2: (int(x), int(y)) for i, (x, y) in enumerate(points)})
+    node_demands = {1: 0}
+    node_demands.update({i + 2: int(d) for i, d in enumerate(demands)})
+    name = f"syn-{layout[0]}-n{num_customers}-r{route_len}"
+    return CVRPInstance.from_data(name, capacity, coords, node_demands, depot=1)
+
+
+# =========================================================================
+#  TIMING
+# =========================================================================
+def _fixed_solution(solver):
+    """Sweep solution driven to a VND local optimum: the fixed point every scan starts from."""
+    solution = solve_sweep(solver.instance)
+    solver._build_candidates(solution)
+    # No time limit: the local search runs until no neighborhood improves
+    solver._deadline = float('inf')
+    solver._expired = False
+    t0 = time.perf_counter()
+    solver._local_search(solution)
+    return solution, time.perf_counter() - t0
+
+
+def _time_scan(solver, op, solution, repeats):
+    """
+    Times one full scan of a VND operator. At a local optimum with every
+    don't-look bit cleared the operator evaluates all its moves and finds
+    none, so the time is pure evaluation cost.
+    """
+    times = []
+    for _ in range(repeats):
+        sol = solution.clone()
+        solver._reset_dont_look_bits(sol)
+        t0 = time.perf_counter()
+        improved = op(sol)
+        times.append(time.perf_counter() - t0)
+        if improved:
+            raise RuntimeError("Fixed solution is not a local optimum; scan timings would include a move.")
+    return times, solver._evals
+
+
+def _time_insertion(solver, solution, nodes, repeats):
+    """Times _best_insertion per call: nodes are removed and reinserted one by one."""
+    times = []
+    for _ in range(repeats):
+        sol = solution.clone()
+        sol.remove_nodes(set(nodes))
+        t0 = time.perf_counter()
+        for node in nodes:
+            solver._best_insertion(sol, node)
+        times.append((time.perf_counter() - t0) / len(nodes))
+    return times, None
+
+
+def bench_instance(instance, operators, repeats, neighbor_k, seed):
+    """Returns one record per operator for a single instance."""
+    solver = VNSSolver(instance, neighbor_k=neighbor_k, verbose=False)
+    solution, ls_time = _fixed_solution(solver)
+    ops = dict(solver.operators)
+
+    # Fixed 10% of the customers for the insertion timings
+    customers = [u for u in range(instance.num_nodes) if u != instance.depot_idx]
+    removed = random.Random(seed).sample(customers, max(1, len(customers) // 10))
+
+    records = []
+    for name in operators:
+        if name == "insertion":
+            times, evals = _time_insertion(solver, solution, removed, repeats)
+        else:
+            times, evals = _time_scan(solver, ops[name], solution, repeats)
+        best = min(times)
+        records.append({
+            "operator": name,
+            "time": best,
+            "median": _median(times),
+            "evals": evals,
+            # Cost per evaluated move; comparable across sizes and machines of one run
+            "ns_per_eval": round(1e9 * best / evals, 2) if evals else None,
+        })
+    return records, solution, ls_time
+
+
+def fit_exponent(sizes, times):
+    """Least-squares slope of log(time) over log(size): time ~ size^exponent."""
+    pairs = [(s, t) for s, t in zip(sizes, times) if t > 0]
+    if len(pairs) < 2:
+        return None
+    x = np.log([s for s, _ in pairs])
+    y = np.log([t for _, t in pairs])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def run_suite(sizes, layouts, route_lengths, operators, repeats, neighbor_k, seed):
+    rows = []
+    for layout in layouts:
+        for route_len in route_lengths:
+            for n in sizes:
+                t0 = time.perf_counter()
+                instance = make_instance(n, layout, route_len, seed)
+                records, solution, ls_time = bench_instance(instance, operators, repeats, neighbor_k, seed)
+                for rec in records:
+                    rec.update({"instance": instance.name, "layout": layout, "n": n, "route_len": route_len,
+                                "routes": len(solution.routes)})
+                    rows.append(rec)
+                print(f"-> {instance.name}: {len(solution.routes)} routes, local optimum in {ls_time:.1f}s, "
+                      f"benchmarked in {time.perf_counter() - t0:.1f}s")
+
+    fits = []
+    for layout in layouts:
+        for route_len in route_lengths:
+            for name in operators:
+                group = sorted((r["n"], r["time"]) for r in rows
+                               if r["layout"] == layout and r["route_len"] == route_len and r["operator"] == name)
+                exponent = fit_exponent([n for n, _ in group], [t for _, t in group])
+                fits.append({"operator": name, "layout": layout, "route_len": route_len,
+                             "exponent": round(exponent, 3) if exponent is not None else None})
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "sizes": list(sizes),
+            "layouts": list(layouts),
+            "route_lengths": list(route_lengths),
+            "repeats": repeats,
+            "neighbor_k": neighbor_k,
+            "seed": seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "rows": rows,
+        "fits": fits,
+    }
+
+
+# =========================================================================
+#  REPORTS
+# =========================================================================
+def _row_key(row):
+    return row["layout"], row["route_len"], row["n"], row["operator"]
+
+
+def print_report(results):
+    sizes = results["meta"]["sizes"]
+    times = {_row_key(r): r["time"] for r in results["rows"]}
+    header = f"{'Operator':<12}{'Layout':<11}{'Len':>5}" + "".join(f"{f'n={n}':>11}" for n in sizes) + f"{'Exp':>7}"
+
+    print("\nFull scan time in ms (insertion: per call), best of "
+          f"{results['meta']['repeats']}; Exp = fitted scaling exponent")
+    print("=" * len(header))
+    print(header)
+    print("=" * len(header))
+    for fit in results["fits"]:
+        layout, route_len, name = fit["layout"], fit["route_len"], fit["operator"]
+        line = f"{name:<12}{layout:<11}{route_len:>5}"
+        for n in sizes:
+            t = times.get((layout, route_len, n, name))
+            line += f"{t * 1000:>11.3f}" if t is not None else f"{'--':>11}"
+        exponent = fit["exponent"]
+        line += f"{exponent:>7.2f}" if exponent is not None else f"{'--':>7}"
+        print(line)
+    print("=" * len(header))
+
+
+def compare(baseline, current, tolerance=0.15):
+    """
+    Returns (rows, regressions) pairing the timings of two result files.
+    A ratio (current / baseline time) above 1 + tolerance is a regression.
+    Differing move counts mean the scan itself changed, not only its speed.
+    """
+    base = {_row_key(r): r for r in baseline["rows"]}
+    rows, regressions = [], []
+    for r in current["rows"]:
+        b = base.get(_row_key(r))
+        if b is None or not b["time"]: continue
+        ratio = r["time"] / b["time"]
+        status = "slower" if ratio > 1 + tolerance else ("faster" if ratio < 1 - tolerance else "")
+        if b["evals"] != r["evals"]:
+            status = (status + " evals-changed").strip()
+        row = (r["instance"], r["operator"], b["time"], r["time"], ratio, status)
+        rows.append(row)
+        if ratio > 1 + tolerance:
+            regressions.append(row)
+    return rows, regressions
+
+
+def print_comparison(rows, tolerance):
+    print(f"\nComparison vs baseline (ratio = current / baseline, tolerance {tolerance:.0%})")
+    print("=" * 80)
+    print(f"{'Instance':<20}{'Operator':<12}{'Base ms':>12}{'Current ms':>12}{'Ratio':>8}  Status")
+    print("=" * 80)
+    for name, op, b, c, ratio, status in rows:
+        print(f"{name:<20}{op:<12}{b * 1000:>12.3f}{c * 1000:>12.3f}{ratio:>8.2f}  {status}")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the local search operators on synthetic instances")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of customers")
+    parser.add_argument("--layouts", nargs="+", default=LAYOUTS, choices=LAYOUTS, help="Customer layouts")
+    parser.add_argument("--route-lengths", type=int, nargs="+", default=DEFAULT_ROUTE_LENGTHS,
+                        help="Average customers per route (sets the capacity)")
+    parser.add_argument("--operators", nargs="+", default=OPERATORS, choices=OPERATORS, help="Operators to time")
+    parser.add_argument("--repeats", "-r", type=int, default=5, help="Timed scans per operator (best is reported)")
+    parser.add_argument("--neighbors", "-k", type=int, default=30, help="Candidate list size (k nearest customers)")
+    parser.add_argument("--seed", type=int, default=0, help="Instance generator seed")
+    parser.add_argument("--out", "-o", type=str, default="operator_results.json", help="Results file")
+    parser.add_argument("--baseline", "-b", type=str, default=None, help="Baseline results file to compare against")
+    parser.add_argument("--compare-only", type=str, default=None,
+                        help="Skip timing and compare this results file against --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative slowdown vs the baseline reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare_only:
+        results = load_results(args.compare_only)
+    else:
+        results = run_suite(args.sizes, args.layouts, args.route_lengths, args.operators, args.repeats,
+                            args.neighbors, args.seed)
+        save_results(args.out, results)
+        print(f"-> Results saved to {args.out}")
+
+    print_report(results)
+
+    if args.baseline:
+        rows, regressions = compare(load_results(args.baseline), results, args.tolerance)
+        print_comparison(rows, args.tolerance)
+        if regressions:
+            print(f"-> {len(regressions)} operator timing(s) slower than the baseline.")
+            sys.exit(1)
+        print("-> No slowdowns beyond the tolerance.")
+
+
+if __name__ == "__main__":
+    main()
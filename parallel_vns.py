@@ -0,0 +1,214 @@
+import copy
+import multiprocessing as mp
+import queue
+import random
+import time
+import uuid
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from edge_weights import TriangularMatrix
+from giant_tour import GiantTour
+from lazy_distances import LazyDistanceMatrix
+from initial_solution import CVRPSolution
+from solution_io import write_sol
+from vns_solver import VNSSolver
+
+
+# =========================================================================
+#  SHARED DISTANCE MATRIX
+# =========================================================================
+def _share_instance(instance):
+    """
+    Copies the distance matrix into a shared memory block once and returns a
+    matrix-less copy of the instance that workers re-attach to that block,
+    so the matrix is never pickled per worker. A matrix that is already
+    memory-mapped from the instance cache is simply re-mapped by the workers.
+    Lazy distances have no matrix to share: the instance travels with its
+    coordinates and every worker computes (and caches) its own rows.
+    """
+    matrix = instance.dist_matrix
+    light = copy.copy(instance)
+    if isinstance(matrix, LazyDistanceMatrix):
+        return None, light, ("lazy", uuid.uuid4().hex)
+    light.dist_matrix = None
+    light.dist_rows = []
+
+    # A packed triangle (symmetric EXPLICIT weights) is shared as its flat data
+    packed_n = matrix.n if isinstance(matrix, TriangularMatrix) else None
+    array = matrix.data if packed_n else matrix
+
+    if isinstance(array, np.memmap) and array.filename:
+        return None, light, ("mmap", array.filename, packed_n)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, light, ("shm", shm.name, array.shape, array.dtype.str, packed_n)
+
+
+def _attach_instance(light, spec):
+    if spec[0] == "lazy":
+        return None
+    packed_n = spec[-1]
+    if spec[0] == "mmap":
+        array = np.load(spec[1], mmap_mode='r')
+        light.attach_distances(TriangularMatrix(array, packed_n) if packed_n else array)
+        return None
+
+    _, name, shape, dtype, _ = spec
+    # Workers share the parent's resource tracker, so attaching does not hand
+    # ownership of the block to this process; the coordinator unlinks it.
+    shm = shared_memory.SharedMemory(name=name)
+
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    light.attach_distances(TriangularMatrix(array, packed_n) if packed_n else array)
+    return shm
+
+
+# =========================================================================
+#  ISLAND WORKER
+# =========================================================================
+def _island_worker(worker_id, seed, light, spec, solver_kwargs, initial_routes, outbox, inbox):
+    shm = _attach_instance(light, spec)
+    random.seed(seed)
+
+    last_sent = [float('inf')]
+
+    def exchange(best):
+        # Emigrate our best if it improved since the last exchange...
+        if best.cost < last_sent[0] - 0.001:
+            last_sent[0] = best.cost
+            outbox.put(("best", worker_id, best.cost, GiantTour.from_solution(best)))
+
+        # ...and take the newest elite the coordinator broadcast to us, if any
+        immigrant = None
+        while True:
+            try:
+                immigrant = inbox.get_nowait()
+            except queue.Empty:
+                break
+        return immigrant
+
+    try:
+        solver = VNSSolver(light, exchange=exchange, verbose=False, **solver_kwargs)
+        initial = CVRPSolution(light, [list(r) for r in initial_routes]) if initial_routes else None
+        best = solver.solve(initial)
+        outbox.put(("done", worker_id, best.cost,
+                    (GiantTour.from_solution(best), solver.stop_reason, solver.iterations)))
+    except Exception as e:
+        outbox.put(("error", worker_id, float('inf'), repr(e)))
+    finally:
+        light.attach_distances(None)
+        if shm is not None:
+            shm.close()
+
+
+# =========================================================================
+#  COORDINATOR
+# =========================================================================
+def solve_parallel(instance, num_workers, seed=42, max_iterations=2000, max_seconds=600,
+                   exchange_interval=10.0, initial_solution=None, checkpoint_path=None,
+                   checkpoint_interval=30.0, **solver_kwargs):
+    """
+    Runs num_workers VNS islands with distinct seeds and returns the global best.
+
+    Every exchange_interval seconds each island sends its best solution to the
+    coordinator, which forwards any new global best to all other islands.
+    exchange_interval=None (or 0) gives plain independent multi-start.
+    All islands start from initial_solution if given (warm start). With
+    checkpoint_path the coordinator writes the global best as a .sol file at
+    most every checkpoint_interval seconds and once at the end. Each island's
+    stop reason and iteration count are printed as it finishes.
+    """
+    # Build shared read-only data once in the parent
+    neighbor_k = solver_kwargs.get("neighbor_k", 30)
+    if instance.neighbor_k != neighbor_k:
+        instance.compute_neighbors(neighbor_k)
+
+    solver_kwargs = dict(solver_kwargs, max_iterations=max_iterations, max_seconds=max_seconds,
+                         exchange_interval=exchange_interval or float('inf'))
+
+    # Solutions cross process boundaries as GiantTour (two flat int arrays);
+    # iterating one yields its routes, so the receiving side is unchanged
+    initial_routes = GiantTour.from_solution(initial_solution) if initial_solution is not None else None
+
+    shm, light, spec = _share_instance(instance)
+    ctx = mp.get_context()
+    outbox = ctx.Queue()
+    inboxes = [ctx.Queue() for _ in range(num_workers)]
+    workers = [
+        ctx.Process(target=_island_worker,
+                    args=(w, seed + w, light, spec, solver_kwargs, initial_routes, outbox, inboxes[w]),
+                    daemon=True)
+        for w in range(num_workers)
+    ]
+
+    best_cost = float('inf')
+    best_routes = None
+    done = set()
+    start = time.time()
+    saved_cost = float('inf')
+    next_checkpoint = start + checkpoint_interval
+
+    def save_checkpoint():
+        nonlocal saved_cost
+        if best_routes is None or best_cost >= saved_cost - 0.001: return
+        try:
+            write_sol(checkpoint_path, CVRPSolution(instance, [list(r) for r in best_routes]))
+            saved_cost = best_cost
+        except OSError as e:
+            print(f"Warning: Could not write checkpoint ({e}).")
+
+    try:
+        for p in workers:
+            p.start()
+
+        while len(done) < num_workers:
+            if checkpoint_path and time.time() >= next_checkpoint:
+                next_checkpoint = time.time() + checkpoint_interval
+                save_checkpoint()
+
+            try:
+                kind, worker_id, cost, payload = outbox.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in workers):
+                    break
+                continue
+
+            if kind == "error":
+                print(f"[Island {worker_id}] Failed: {payload}")
+                done.add(worker_id)
+                continue
+            if kind == "done":
+                done.add(worker_id)
+                payload, stop_reason, iterations = payload
+                print(f"[{time.time() - start:7.1f}s] Island {worker_id}: Stopped by {stop_reason} "
+                      f"after {iterations} iterations (best {cost:.2f})")
+
+            if cost < best_cost - 0.001:
+                best_cost = cost
+                best_routes = payload
+                print(f"[{time.time() - start:7.1f}s] Island {worker_id}: New Global Best = {cost:.2f}")
+                for w, inbox in enumerate(inboxes):
+                    if w != worker_id and w not in done:
+                        inbox.put((cost, payload))
+
+        for p in workers:
+            p.join(timeout=5.0)
+    finally:
+        for p in workers:
+            if p.is_alive():
+                p.terminate()
+        # Elites broadcast to an island that had just finished are never read
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    if best_routes is None:
+        raise RuntimeError("All parallel VNS workers failed.")
+    if checkpoint_path:
+        save_checkpoint()
+    return CVRPSolution(instance, [list(r) for r in best_routes])
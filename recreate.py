@@ -0,0 +1,168 @@
+import heapq
+
+
+class InsertionCache:
+    """
+    Insertion-cost table for the Recreate phase.
+
+    For every pending (removed) node u, options[u][r] = (delta, pos) is the
+    cheapest feasible insertion of u into route r, looking at positions next
+    to u's candidate neighbors (or at every position of every route when u has
+    no feasible candidate position, as in VNSSolver._best_insertion). After a
+    node is inserted into route r only the entries for r are refreshed, and
+    only for the pending nodes that can be affected: those with an entry in r
+    and those that have the inserted node among their candidates.
+
+    A lazy heap keyed by greedy cost or by k-regret gives the next node in
+    O(log n) instead of rescanning all pending nodes.
+    """
+
+    def __init__(self, solution, candidates, reverse_candidates, pending, regret_k=1):
+        self.solution = solution
+        self.instance = solution.instance
+        self.candidates = candidates
+        self.reverse_candidates = reverse_candidates
+        self.regret_k = regret_k
+
+        D = self.instance.dist_rows
+        depot = self.instance.depot_idx
+        self.new_route_delta = {u: D[depot][u] + D[u][depot] for u in pending}
+
+        self.pending = set(pending)
+        self.options = {u: {} for u in pending}
+        self.watchers = {}          # route index -> pending nodes with an entry for it
+        self.full_scan = set()      # pending nodes without a feasible candidate position
+        self.version = {u: 0 for u in pending}
+        self.heap = []
+
+        for u in pending:
+            self._refresh_node(u)
+            self._push(u)
+
+    # --- TABLE MAINTENANCE ---
+
+    def _route_best(self, u, r_idx):
+        sol = self.solution
+        D = self.instance.dist_rows
+        depot = self.instance.depot_idx
+        if sol.loads[r_idx] + self.instance.node_demands[u] > self.instance.capacity:
+            return None
+
+        route = sol.routes[r_idx]
+        if u in self.full_scan:
+            positions = range(len(route) + 1)
+        else:
+            node_route = sol.node_route
+            node_pos = sol.node_pos
+            positions = []
+            for v in self.candidates[u]:
+                if node_route[v] == r_idx:
+                    positions.append(node_pos[v])
+                    positions.append(node_pos[v] + 1)
+
+        best = None
+        for k in positions:
+            prev_n = route[k - 1] if k > 0 else depot
+            next_n = route[k] if k < len(route) else depot
+            delta = D[prev_n][u] + D[u][next_n] - D[prev_n][next_n]
+            if best is None or delta < best[0]:
+                best = (delta, k)
+        return best
+
+    def _set_entry(self, u, r_idx):
+        best = self._route_best(u, r_idx)
+        if best is None:
+            self.options[u].pop(r_idx, None)
+            self.watchers.get(r_idx, set()).discard(u)
+        else:
+            self.options[u][r_idx] = best
+            self.watchers.setdefault(r_idx, set()).add(u)
+
+    def _refresh_node(self, u):
+        node_route = self.solution.node_route
+        routes = {node_route[v] for v in self.candidates[u] if node_route[v] >= 0}
+        for r_idx in routes:
+            self._set_entry(u, r_idx)
+
+        if not self.options[u]:
+            # Same fallback as _best_insertion: consider every route
+            self.full_scan.add(u)
+            for r_idx in range(len(self.solution.routes)):
+                self._set_entry(u, r_idx)
+
+    def _key(self, u):
+        deltas = sorted(d for d, _ in self.options[u].values())
+        fallback = self.new_route_delta[u]
+        deltas.append(fallback)
+        deltas.sort()
+
+        best = deltas[0]
+        if self.regret_k <= 1:
+            return (best, u)
+
+        # Missing alternatives are priced at the new-route fallback
+        regret = 0.0
+        for i in range(1, self.regret_k):
+            regret += (deltas[i] if i < len(deltas) else fallback) - best
+        return (-regret, best, u)
+
+    def _push(self, u):
+        self.version[u] += 1
+        heapq.heappush(self.heap, (self._key(u), self.version[u], u))
+
+    # --- RECREATE ---
+
+    def insert_next(self):
+        """Inserts the next pending node (cheapest or max-regret) at its best position."""
+        while True:
+            _, version, u = heapq.heappop(self.heap)
+            if u in self.pending and version == self.version[u]:
+                break
+
+        sol = self.solution
+        best = None
+        for r_idx, (delta, pos) in self.options[u].items():
+            if best is None or delta < best[0]:
+                best = (delta, r_idx, pos)
+
+        self.pending.discard(u)
+        self.full_scan.discard(u)
+        for r_idx in self.options.pop(u):
+            self.watchers[r_idx].discard(u)
+
+        if best is None or self.new_route_delta[u] < best[0]:
+            sol.add_route([u])
+            r_idx = len(sol.routes) - 1
+        else:
+            _, r_idx, pos = best
+            sol.insert(r_idx, pos, u)
+
+        # Refresh the entries for the modified route only
+        affected = set(self.watchers.get(r_idx, ()))
+        affected.update(v for v in self.reverse_candidates[u] if v in self.pending)
+        affected.update(self.full_scan)
+        for v in affected:
+            self._set_entry(v, r_idx)
+            if not self.options[v] and v not in self.full_scan:
+                self._refresh_node(v)
+            self._push(v)
+
+    def run(self, should_stop=None):
+        """Inserts all pending nodes; returns False if should_stop() fired first."""
+        count = 0
+        while self.pending:
+            if should_stop is not None and not count & 15 and should_stop():
+                return False
+            self.insert_next()
+            count += 1
+        return True
+
+
+def recreate_with_cache(solution, nodes, candidates, reverse_candidates, regret_k=1, should_stop=None):
+    """Greedy (regret_k=1) or k-regret insertion of the given unassigned nodes."""
+    for u in nodes:
+        demand = solution.instance.node_demands[u]
+        if demand > solution.instance.capacity:
+            raise ValueError(f"Node {solution.instance.nodes[u]} demand ({demand}) exceeds vehicle capacity "
+                             f"({solution.instance.capacity}).")
+    return InsertionCache(solution, candidates, reverse_candidates, nodes, regret_k).run(should_stop)
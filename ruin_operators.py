@@ -0,0 +1,163 @@
+import math
+import random
+
+# name -> function(solution, num_to_remove) returning the set of customers to remove.
+# Operators only choose nodes; VNSSolver removes and re-inserts them.
+RUIN_OPERATORS = {}
+
+
+def register_ruin(name):
+    def decorator(fn):
+        RUIN_OPERATORS[name] = fn
+        return fn
+    return decorator
+
+
+def parse_ruin_spec(spec):
+    """
+    Parses a selection such as "sisr", "radial,random" or "sisr:3,shaw:1"
+    into (names, weights) for weighted random choice per iteration.
+    """
+    names, weights = [], []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item: continue
+        name, _, weight = item.partition(":")
+        if name not in RUIN_OPERATORS:
+            raise ValueError(f"Unknown ruin operator '{name}'. Available: {', '.join(RUIN_OPERATORS)}")
+        names.append(name)
+        weights.append(float(weight) if weight else 1.0)
+    if not names:
+        raise ValueError("Empty ruin operator selection.")
+    return names, weights
+
+
+def _random_customer(solution):
+    routes = [r for r in solution.routes if r]
+    route = random.choices(routes, weights=[len(r) for r in routes])[0]
+    return random.choice(route)
+
+
+def _spatial_order(instance, seed, count):
+    """Customers around seed, closest first, expanding over neighbor lists."""
+    neighbors = instance.neighbors
+    D = instance.dist_rows
+    seen = {seed}
+    frontier = [seed]
+    while len(seen) < count + 1 and frontier:
+        nxt = []
+        for u in frontier:
+            for v in neighbors[u]:
+                if v not in seen:
+                    seen.add(v)
+                    nxt.append(v)
+        frontier = nxt
+    row = D[seed]
+    return sorted(seen, key=lambda v: row[v])
+
+
+# =========================================================================
+#  OPERATORS
+# =========================================================================
+@register_ruin("random")
+def random_removal(solution, num_to_remove):
+    all_customers = [n for r in solution.routes for n in r]
+    return set(random.sample(all_customers, min(len(all_customers), num_to_remove)))
+
+
+@register_ruin("radial")
+def radial_removal(solution, num_to_remove):
+    """Removes a random seed customer and its closest customers."""
+    seed = _random_customer(solution)
+    return set(_spatial_order(solution.instance, seed, num_to_remove)[:num_to_remove])
+
+
+@register_ruin("route")
+def route_removal(solution, num_to_remove):
+    """Removes whole routes, starting from a random customer's route and moving to nearby routes."""
+    seed = _random_customer(solution)
+    node_route = solution.node_route
+    removed = set()
+    for v in _spatial_order(solution.instance, seed, num_to_remove):
+        if len(removed) >= num_to_remove: break
+        if v in removed: continue
+        removed.update(solution.routes[node_route[v]])
+    return removed
+
+
+@register_ruin("sisr")
+def string_removal(solution, num_to_remove, max_string_len=10):
+    """
+    SISR string removal (Christiaens & Vanden Berghe, 2020): around a seed
+    customer, removes one string of consecutive customers from each of the
+    k_s closest routes. num_to_remove plays the role of the average number
+    of removed customers.
+    """
+    routes = solution.routes
+    node_route = solution.node_route
+    node_pos = solution.node_pos
+
+    avg_len = sum(len(r) for r in routes) / max(1, sum(1 for r in routes if r))
+    ls_max = min(max_string_len, avg_len)
+    ks_max = 4.0 * num_to_remove / (1.0 + ls_max) - 1.0
+    ks = int(random.uniform(1.0, ks_max + 1.0))
+
+    seed = _random_customer(solution)
+    removed = set()
+    ruined_routes = set()
+    for c in _spatial_order(solution.instance, seed, 4 * num_to_remove):
+        if len(ruined_routes) >= ks: break
+        if c in removed or node_route[c] in ruined_routes: continue
+
+        r_idx = node_route[c]
+        route = routes[r_idx]
+        lt_max = min(len(route), ls_max)
+        lt = max(1, int(random.uniform(1.0, lt_max + 1.0)))
+
+        # Random string of length lt that contains c
+        pos = node_pos[c]
+        start = random.randint(max(0, pos - lt + 1), min(pos, len(route) - lt))
+        removed.update(route[start:start + lt])
+        ruined_routes.add(r_idx)
+    return removed
+
+
+@register_ruin("shaw")
+def shaw_removal(solution, num_to_remove, phi=9.0, chi=2.0, psi=3.0, determinism=6):
+    """
+    Shaw relatedness removal (Ropke & Pisinger, 2006) without time windows:
+    repeatedly picks a removed customer and removes one of its most related
+    customers (distance, demand, same route), with randomized rank selection.
+    Candidates come from neighbor lists instead of a sort over all customers.
+    """
+    instance = solution.instance
+    D = instance.dist_rows
+    demands = instance.node_demands
+    node_route = solution.node_route
+    neighbors = instance.neighbors
+    max_q = max(1, max(demands))
+
+    def relatedness(i, j):
+        # Distances are normalized by i's farthest listed neighbor (1 if it has none)
+        max_d = max((D[i][v] for v in neighbors[i]), default=0) or 1.0
+        same_route = 0.0 if node_route[i] == node_route[j] else 1.0
+        return phi * D[i][j] / max_d + chi * abs(demands[i] - demands[j]) / max_q + psi * same_route
+
+    removed = [_random_customer(solution)]
+    removed_set = set(removed)
+    while len(removed) < num_to_remove:
+        r = random.choice(removed)
+        listed = neighbors[r] if r < len(neighbors) else ()
+        pool = [v for v in listed if v not in removed_set and node_route[v] >= 0]
+        if not pool:
+            # Neighborhood exhausted: restart from a fresh random customer
+            v = _random_customer(solution)
+            if v in removed_set:
+                if len(removed_set) >= sum(len(rt) for rt in solution.routes): break
+                continue
+        else:
+            pool.sort(key=lambda v: relatedness(r, v))
+            v = pool[int(math.floor(random.random() ** determinism * len(pool)))]
+        removed.append(v)
+        removed_set.add(v)
+    return removed_set
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+
+
+def canonical_hash(routes):
+    """
+    Hash of a solution that ignores route order and route direction: each
+    route is read from its smaller end, and the route hashes are combined in
+    sorted order. Empty routes are ignored.
+    """
+    keys = []
+    for r in routes:
+        if not r: continue
+        keys.append(hash(tuple(r) if r[0] <= r[-1] else tuple(reversed(r))))
+    keys.sort()
+    return hash(tuple(keys))
+
+
+class LocalOptimumCache:
+    """
+    Bounded LRU map from canonical_hash() of a solution to the cost of the
+    local optimum _local_search reaches from it. Both post-recreate states and
+    the local optima themselves (which map to their own cost) are stored, so a
+    recreate that lands on a known state can skip the VND pass.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+
+    def get(self, key):
+        self.lookups += 1
+        cost = self._entries.get(key)
+        if cost is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return cost
+
+    def put(self, key, cost):
+        self._entries[key] = cost
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
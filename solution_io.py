@@ -0,0 +1,123 @@
+import os
+import tempfile
+
+from initial_solution import CVRPSolution
+
+# os.umask can only be read by setting it; done once here instead of per write,
+# since swapping the process umask is not thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+# CVRPLIB .sol files number customers 1..n-1 in file order with the depot left
+# implicit, i.e. customer c is the c-th non-depot node of the instance.
+def _customer_indices(instance):
+    return [i for i in range(instance.num_nodes) if i != instance.depot_idx]
+
+
+def read_sol(filepath):
+    """Parses a CVRPLIB .sol file into (routes of customer numbers, cost or None)."""
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"File not found: {filepath}")
+
+    routes, cost = [], None
+    with open(filepath, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if line.startswith("Route"):
+                _, _, rest = line.partition(":")
+                try:
+                    route = [int(x) for x in rest.split()]
+                except ValueError:
+                    raise ValueError(f"{filepath}:{line_no}: Invalid customer number in '{line}'.")
+                if route: routes.append(route)
+            elif line.startswith("Cost"):
+                cost = float(line.split()[-1])
+    return routes, cost
+
+
+def solution_from_sol(instance, filepath):
+    """
+    Loads a .sol file as a CVRPSolution of the given instance. Raises
+    ValueError unless every customer is visited exactly once and no route
+    exceeds the vehicle capacity.
+    """
+    sol_routes, file_cost = read_sol(filepath)
+    solution = solution_from_routes(instance, sol_routes, f"Solution {filepath}")
+    if file_cost is not None and abs(file_cost - solution.cost) > 0.5:
+        print(f"Warning: {filepath} states Cost {file_cost}, recomputed {solution.cost:.2f}.")
+    return solution
+
+
+def solution_from_routes(instance, sol_routes, source="Solution"):
+    """Same checks as solution_from_sol, for routes of .sol customer numbers."""
+    customers = _customer_indices(instance)
+
+    errors = []
+    seen = set()
+    routes = []
+    for k, route in enumerate(sol_routes, 1):
+        nodes = []
+        for c in route:
+            if not 1 <= c <= len(customers):
+                errors.append(f"Route #{k}: customer {c} does not exist")
+                continue
+            if c in seen:
+                errors.append(f"Route #{k}: customer {c} is visited twice")
+                continue
+            seen.add(c)
+            nodes.append(customers[c - 1])
+        load = sum(instance.node_demands[n] for n in nodes)
+        if load > instance.capacity:
+            errors.append(f"Route #{k}: load {load} exceeds capacity {instance.capacity}")
+        if nodes: routes.append(nodes)
+
+    missing = len(customers) - len(seen)
+    if missing:
+        errors.append(f"{missing} customers are not visited")
+    if errors:
+        shown = "; ".join(errors[:5]) + (f" (+{len(errors) - 5} more)" if len(errors) > 5 else "")
+        raise ValueError(f"{source} does not fit instance {instance.name}: {shown}.")
+
+    return CVRPSolution(instance, routes)
+
+
+def to_sol_routes(solution):
+    """The routes of a solution as .sol customer numbers (inverse of solution_from_routes)."""
+    numbers = {n: c for c, n in enumerate(_customer_indices(solution.instance), 1)}
+    return [[numbers[n] for n in route] for route in solution.routes if route]
+
+
+def write_sol(filepath, solution):
+    """
+    Writes a solution in CVRPLIB .sol format. The file is written to a
+    temporary sibling and renamed over the target, so a reader (or a killed
+    run) never sees a partial file. The result keeps the permissions of the
+    file it replaces, or gets the usual umask-based mode for a new file.
+    """
+    cost = solution.cost
+    cost_str = str(int(round(cost))) if abs(cost - round(cost)) < 1e-6 else f"{cost:.3f}"
+
+    lines = []
+    for k, route in enumerate(to_sol_routes(solution), 1):
+        lines.append(f"Route #{k}: " + " ".join(map(str, route)))
+    lines.append(f"Cost {cost_str}")
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(prefix=".sol.", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600, which os.replace would carry over
+        try:
+            mode = os.stat(filepath).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
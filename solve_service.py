@@ -0,0 +1,572 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from multiprocessing import resource_tracker
+
+from CVRP_Instance import CVRPInstance
+from instance_cache import file_hash
+from parallel_vns import _share_instance, _attach_instance
+from solution_io import solution_from_routes, to_sol_routes
+from vns_solver import VNSSolver
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "cvrp_solver.sock")
+
+# Request keys passed through to VNSSolver
+SOLVER_OPTIONS = ("neighbor_k", "granular_beta", "recreate", "ruin", "init", "pair_moves",
+                  "target_cost", "stall_limit", "ls_cache_size", "split", "adaptive")
+
+# Events after which a job produces no further output
+FINAL_EVENTS = ("done", "cancelled", "error")
+
+
+# =========================================================================
+#  WORKER PROCESS
+# =========================================================================
+class _JobCancel:
+    """VNSSolver.stop_event of one job: set once the parent writes its job number to the worker's flag."""
+    __slots__ = ("flag", "job_no")
+
+    def __init__(self, flag, job_no):
+        self.flag = flag
+        self.job_no = job_no
+
+    def is_set(self):
+        return self.flag.value == self.job_no
+
+
+def _service_worker(worker_id, jobs, outbox, cancel_flag, cache_size):
+    # Ctrl+C reaches the whole process group; the service shuts workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Instances stay attached between jobs, keyed by their shared block
+    attached = OrderedDict()
+    try:
+        while True:
+            msg = jobs.get()
+            if msg is None: break
+            job_no, light, spec, params = msg
+            try:
+                entry = attached.pop(spec[1], None) or (light, _attach_instance(light, spec))
+                attached[spec[1]] = entry
+                while len(attached) > cache_size:
+                    _detach(*attached.popitem(last=False)[1])
+                outbox.put(("started", job_no, worker_id))
+                _run_job(entry[0], job_no, params, outbox, _JobCancel(cancel_flag, job_no))
+            except Exception as e:
+                outbox.put(("error", job_no, repr(e)))
+    finally:
+        for entry in attached.values():
+            _detach(*entry)
+
+
+def _detach(instance, shm):
+    instance.attach_distances(None)
+    if shm is not None:
+        shm.close()
+
+
+def _run_job(instance, job_no, params, outbox, cancel):
+    random.seed(params["seed"])
+    start = time.monotonic()
+    last_sent = [float('inf')]
+
+    def report(best):
+        # Exchange hook: streams the incumbent whenever it improved since the last report
+        if best.cost < last_sent[0] - 0.001:
+            last_sent[0] = best.cost
+            outbox.put(("incumbent", job_no, {"cost": best.cost, "elapsed": round(time.monotonic() - start, 3),
+                                              "routes": to_sol_routes(best)}))
+        return None
+
+    initial = None
+    if params.get("warm_start"):
+        initial = solution_from_routes(instance, params["warm_start"], "Warm start")
+
+    solver = VNSSolver(instance, max_iterations=params["iterations"], max_seconds=params["time"],
+                       exchange=report, exchange_interval=params["incumbent_interval"], stop_event=cancel,
+                       verbose=False, **params["options"])
+    best = solver.solve(initial)
+    outbox.put(("done", job_no, {
+        "cost": best.cost,
+        "routes": to_sol_routes(best),
+        "vehicles": len([r for r in best.routes if r]),
+        "stop_reason": solver.stop_reason,
+        "iterations": solver.iterations,
+        "solve_time": round(solver.elapsed, 3),
+        "time_to_best": round(solver.time_to_best, 3),
+    }))
+
+
+# =========================================================================
+#  INSTANCE CACHE
+# =========================================================================
+def _content_key(request):
+    if "instance_data" in request:
+        return hashlib.sha256(request["instance_data"].encode()).hexdigest()
+    return file_hash(request["instance"])
+
+
+def _parse_instance(request, neighbor_k):
+    if "instance_data" not in request:
+        instance = CVRPInstance(request["instance"])
+    else:
+        # The parser reads files; inline .vrp text goes through a temporary one
+        fd, path = tempfile.mkstemp(suffix=".vrp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(request["instance_data"])
+            instance = CVRPInstance(path)
+        finally:
+            os.remove(path)
+    instance.compute_neighbors(neighbor_k)
+    return instance
+
+
+class InstanceCache:
+    """
+    LRU of parsed instances keyed by the SHA-256 of the .vrp content. Each
+    entry's distance matrix is copied into shared memory once (see
+    parallel_vns._share_instance), so a job only ships the matrix-less
+    instance to a worker (lazy distances ship just their coordinates). Entries pinned by queued or running jobs are never
+    evicted, so the cache may briefly exceed maxsize.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, instance):
+        if key in self._entries:
+            return self._entries[key]
+        shm, light, spec = _share_instance(instance)
+        entry = {"key": key, "instance": instance, "shm": shm, "light": light, "spec": spec, "pins": 0}
+        self._entries[key] = entry
+        self._evict()
+        return entry
+
+    def pin(self, entry):
+        entry["pins"] += 1
+
+    def unpin(self, entry):
+        entry["pins"] -= 1
+        self._evict()
+
+    def _evict(self):
+        for key in list(self._entries):
+            if len(self._entries) <= self.maxsize: break
+            if self._entries[key]["pins"] == 0:
+                self._release(self._entries.pop(key))
+
+    @staticmethod
+    def _release(entry):
+        if entry["shm"] is not None:
+            entry["shm"].close()
+            entry["shm"].unlink()
+
+    def close(self):
+        for entry in self._entries.values():
+            self._release(entry)
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# =========================================================================
+#  SERVICE
+# =========================================================================
+class _Job:
+    def __init__(self, no, job_id, params, entry, out):
+        self.no = no
+        self.id = job_id
+        self.params = params
+        self.entry = entry
+        self.out = out  # asyncio.Queue of the connection that submitted the job
+        self.worker = None
+        self.submitted = time.monotonic()
+        self.started = None
+
+
+class SolveService:
+    """
+    Long-running solve service speaking JSON lines over a Unix socket (or TCP
+    on localhost). Instances are parsed once and kept in an InstanceCache;
+    jobs run on a fixed set of worker processes, wait in a bounded FIFO queue
+    when all are busy, stream improving incumbents while they run and can be
+    cancelled at any time through the solver's deadline checks.
+
+    Requests (one JSON object per line):
+        {"op": "solve", "instance": path | "instance_data": .vrp text, "id": ..., "seed": 42,
+         "time": 60, "iterations": 10**9, "incumbent_interval": 1.0, "warm_start": [[...], ...],
+         "options": {VNSSolver keyword arguments, see SOLVER_OPTIONS}}
+        {"op": "cancel", "id": ...}
+        {"op": "status"}
+    Events: queued, started, incumbent, done, cancelled, error, status. Routes
+    use .sol customer numbers.
+    """
+
+    def __init__(self, workers=1, cache_size=8, max_queue=64, neighbor_k=30):
+        self.num_workers = workers
+        self.max_queue = max_queue
+        self.neighbor_k = neighbor_k
+        self.instances = InstanceCache(cache_size)
+        self.ctx = mp.get_context()
+        self.outbox = self.ctx.Queue()
+        self.inboxes = [self.ctx.Queue() for _ in range(workers)]
+        self.cancel_flags = [self.ctx.RawValue('q', 0) for _ in range(workers)]
+        self.processes = [None] * workers
+        self.running = [None] * workers
+        self.pending = deque()
+        self.jobs = {}
+        self._job_numbers = itertools.count(1)
+        self._loop = None
+        self._stopping = False
+        self._closing = threading.Event()
+        self._connections = {}
+
+    # --- WORKERS ---
+
+    def _spawn(self, w):
+        p = self.ctx.Process(target=_service_worker,
+                             args=(w, self.inboxes[w], self.outbox, self.cancel_flags[w], self.instances.maxsize),
+                             daemon=True)
+        p.start()
+        self.processes[w] = p
+
+    def _pump_events(self):
+        # Runs in a thread: forwards worker messages into the event loop
+        while not self._closing.is_set():
+            try:
+                msg = self.outbox.get(timeout=0.5)
+            except queue.Empty:
+                dead = [w for w, p in enumerate(self.processes) if p is not None and not p.is_alive()]
+                if dead and not self._closing.is_set():
+                    self._loop.call_soon_threadsafe(self._on_worker_died, dead)
+                continue
+            try:
+                self._loop.call_soon_threadsafe(self._on_message, msg)
+            except RuntimeError:
+                break  # event loop already closed
+
+    def _on_worker_died(self, dead):
+        for w in dead:
+            if self.processes[w] is None or self.processes[w].is_alive(): continue
+            job = self.running[w]
+            if job is not None:
+                self._finish(job, {"event": "error", "message": f"Worker {w} exited unexpectedly."})
+            self._spawn(w)
+        self._dispatch()
+
+    def _on_message(self, msg):
+        kind, job_no, payload = msg
+        job = self.jobs.get(job_no)
+        if job is None: return
+        if kind == "started":
+            job.started = time.monotonic()
+            self._emit(job, {"event": "started", "worker": payload,
+                             "queue_time": round(job.started - job.submitted, 3)})
+        elif kind == "incumbent":
+            self._emit(job, dict(payload, event="incumbent"))
+        elif kind == "done":
+            cancelled = payload["stop_reason"] == "cancelled"
+            self._finish(job, dict(payload, event="cancelled" if cancelled else "done",
+                                   total_time=round(time.monotonic() - job.submitted, 3)))
+        elif kind == "error":
+            self._finish(job, {"event": "error", "message": payload})
+
+    def _dispatch(self):
+        while self.pending:
+            idle = [w for w in range(self.num_workers) if self.running[w] is None]
+            if not idle: break
+            job, w = self.pending.popleft(), idle[0]
+            job.worker = w
+            self.running[w] = job
+            self.inboxes[w].put((job.no, job.entry["light"], job.entry["spec"], job.params))
+
+    def _emit(self, job, event):
+        job.out.put_nowait(dict(event, id=job.id))
+
+    def _finish(self, job, event):
+        self.jobs.pop(job.no, None)
+        if job.worker is not None and self.running[job.worker] is job:
+            self.running[job.worker] = None
+        self.instances.unpin(job.entry)
+        self._emit(job, event)
+        self._dispatch()
+
+    # --- REQUESTS ---
+
+    async def _submit(self, request, out):
+        job_id = request.get("id")
+        if self._stopping:
+            return {"event": "error", "id": job_id, "message": "Service is shutting down."}
+        if job_id is not None and any(j.id == job_id for j in self.jobs.values()):
+            return {"event": "error", "id": job_id, "message": f"Job '{job_id}' is already active."}
+        if len(self.pending) >= self.max_queue:
+            return {"event": "error", "id": job_id, "message": f"Queue full ({self.max_queue} jobs waiting)."}
+        if "instance" not in request and "instance_data" not in request:
+            return {"event": "error", "id": job_id, "message": "Request needs 'instance' or 'instance_data'."}
+
+        options = request.get("options", {})
+        unknown = set(options) - set(SOLVER_OPTIONS)
+        if unknown:
+            return {"event": "error", "id": job_id, "message": f"Unknown solver options: {', '.join(sorted(unknown))}."}
+
+        try:
+            key = await self._loop.run_in_executor(None, _content_key, request)
+            entry = self.instances.get(key)
+            if entry is None:
+                instance = await self._loop.run_in_executor(None, _parse_instance, request, self.neighbor_k)
+                entry = self.instances.put(key, instance)
+        except Exception as e:
+            # Instance data comes from the client: any parse failure is its error, not the service's
+            return {"event": "error", "id": job_id, "message": f"{type(e).__name__}: {e}"}
+
+        no = next(self._job_numbers)
+        params = {
+            "seed": request.get("seed", 42),
+            "time": request.get("time", 600),
+            "iterations": request.get("iterations", 10 ** 9),
+            "incumbent_interval": request.get("incumbent_interval", 1.0),
+            "warm_start": request.get("warm_start"),
+            "options": options,
+        }
+        job = _Job(no, job_id if job_id is not None else f"job-{no}", params, entry, out)
+        self.instances.pin(entry)
+        self.jobs[no] = job
+        self.pending.append(job)
+        self._emit(job, {"event": "queued", "instance": entry["instance"].name, "position": len(self.pending)})
+        self._dispatch()
+        return None
+
+    def _cancel(self, job_id):
+        for job in list(self.jobs.values()):
+            if job.id != job_id: continue
+            if job in self.pending:
+                self.pending.remove(job)
+                # Same fields as a job that ran, so clients can treat both alike
+                self._finish(job, {"event": "cancelled", "cost": None, "routes": [], "vehicles": None,
+                                   "stop_reason": "cancelled", "iterations": 0, "solve_time": 0,
+                                   "time_to_best": None,
+                                   "total_time": round(time.monotonic() - job.submitted, 3)})
+            else:
+                # The worker's solver sees the flag at its next deadline check
+                self.cancel_flags[job.worker].value = job.no
+            return None
+        return {"event": "error", "id": job_id, "message": f"No active job '{job_id}'."}
+
+    def _status(self):
+        return {
+            "event": "status",
+            "workers": self.num_workers,
+            "running": [j.id for j in self.running if j is not None],
+            "queued": [j.id for j in self.pending],
+            "cached_instances": len(self.instances),
+            "cache_hits": self.instances.hits,
+            "cache_misses": self.instances.misses,
+        }
+
+    async def _handle(self, reader, writer):
+        out = asyncio.Queue()
+        self._connections[asyncio.current_task()] = writer
+
+        async def send():
+            while True:
+                event = await out.get()
+                writer.write((json.dumps(event) + "\n").encode())
+                await writer.drain()
+
+        sender = asyncio.ensure_future(send())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    request = json.loads(line)
+                    op = request.get("op", "solve")
+                except (ValueError, AttributeError):
+                    out.put_nowait({"event": "error", "message": "Invalid JSON request."})
+                    continue
+                if op == "solve":
+                    reply = await self._submit(request, out)
+                elif op == "cancel":
+                    reply = self._cancel(request.get("id"))
+                elif op == "status":
+                    reply = self._status()
+                else:
+                    reply = {"event": "error", "message": f"Unknown op '{op}'."}
+                if reply is not None:
+                    out.put_nowait(reply)
+        except ConnectionError:
+            pass
+        finally:
+            # A client that goes away takes its jobs with it
+            for job in list(self.jobs.values()):
+                if job.out is out:
+                    self._cancel(job.id)
+            sender.cancel()
+            writer.close()
+            self._connections.pop(asyncio.current_task(), None)
+
+    async def _stop_jobs(self, timeout=5.0):
+        # Queued jobs are dropped; running ones stop at their next deadline check and report back
+        self._stopping = True
+        for job in list(self.pending):
+            self._cancel(job.id)
+        for w, job in enumerate(self.running):
+            if job is not None:
+                self.cancel_flags[w].value = job.no
+        deadline = time.monotonic() + timeout
+        while any(job is not None for job in self.running) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+    async def serve(self, socket_path=DEFAULT_SOCKET, host="127.0.0.1", port=None):
+        self._loop = asyncio.get_running_loop()
+        # Forked workers must inherit the tracker; one of their own would unlink
+        # the shared blocks when the worker exits
+        resource_tracker.ensure_running()
+        for w in range(self.num_workers):
+            self._spawn(w)
+        pump = threading.Thread(target=self._pump_events, daemon=True)
+        pump.start()
+
+        if port is not None:
+            server = await asyncio.start_server(self._handle, host, port)
+            address = f"{host}:{port}"
+        else:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self._handle, socket_path)
+            address = socket_path
+        print(f"-> Solve service listening on {address} ({self.num_workers} workers)")
+
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # no signal handlers on this platform; Ctrl+C still raises KeyboardInterrupt
+
+        try:
+            async with server:
+                await stop.wait()
+                print("-> Shutting down solve service")
+                await self._stop_jobs()
+        finally:
+            self._closing.set()
+            for inbox in self.inboxes:
+                inbox.put(None)
+            for p in self.processes:
+                p.join(timeout=5.0)
+                if p.is_alive():
+                    p.terminate()
+            # Closing the transports ends each handler's read loop
+            handlers = list(self._connections)
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            self.instances.close()
+            if port is None and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+# =========================================================================
+#  CLIENT
+# =========================================================================
+def submit(request, socket_path=DEFAULT_SOCKET, host="127.0.0.1", port=None):
+    """Sends one solve request to a running service and yields its events until the job ends."""
+    if port is not None:
+        sock = socket.create_connection((host, port))
+    else:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path)
+    with sock, sock.makefile('rwb') as f:
+        f.write((json.dumps(dict(request, op="solve")) + "\n").encode())
+        f.flush()
+        for line in f:
+            event = json.loads(line)
+            yield event
+            if event["event"] in FINAL_EVENTS:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running CVRP solve service (JSON lines over a socket)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for p in (sub.add_parser("serve", help="Run the service"), sub.add_parser("solve", help="Submit one job")):
+        p.add_argument("--socket", type=str, default=DEFAULT_SOCKET, help="Unix socket path")
+        p.add_argument("--port", type=int, default=None, help="Use TCP on localhost instead of a Unix socket")
+
+    serve = sub.choices["serve"]
+    serve.add_argument("--workers", "-w", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                       help="Solver processes")
+    serve.add_argument("--cache-size", type=int, default=8, help="Parsed instances kept in memory")
+    serve.add_argument("--max-queue", type=int, default=64, help="Jobs allowed to wait for a worker")
+    serve.add_argument("--neighbors", "-k", type=int, default=30, help="Candidate list size of cached instances")
+
+    solve = sub.choices["solve"]
+    solve.add_argument("--instance", "-i", type=str, required=True, help="Path to the .vrp input file")
+    solve.add_argument("--send-data", action="store_true", help="Send the file content instead of its path")
+    solve.add_argument("--seed", "-s", type=int, default=42, help="Random seed")
+    solve.add_argument("--time", "-t", type=float, default=60, help="Max execution time")
+    solve.add_argument("--iter", type=int, default=10 ** 9, help="Max iterations")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        service = SolveService(args.workers, args.cache_size, args.max_queue, args.neighbors)
+        try:
+            asyncio.run(service.serve(args.socket, port=args.port))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    request = {"seed": args.seed, "time": args.time, "iterations": args.iter}
+    if args.send_data:
+        with open(args.instance, 'r') as f:
+            request["instance_data"] = f.read()
+    else:
+        request["instance"] = os.path.abspath(args.instance)
+
+    t0 = time.time()
+    for event in submit(request, args.socket, port=args.port):
+        kind = event["event"]
+        if kind == "incumbent":
+            print(f"[{event['elapsed']:7.1f}s] Incumbent = {event['cost']:.2f}")
+        elif kind == "cancelled" and event.get("cost") is None:
+            print(f"-> Cancelled while queued (round trip {time.time() - t0:.2f}s)")
+        elif kind in ("done", "cancelled"):
+            print(f"-> {kind.capitalize()}: Cost {event['cost']:.2f}, {event['vehicles']} vehicles, "
+                  f"stopped by {event['stop_reason']} after {event['iterations']} iterations "
+                  f"(solve {event['solve_time']:.2f}s, round trip {time.time() - t0:.2f}s)")
+        elif kind == "error":
+            print(f"Error: {event['message']}")
+            sys.exit(1)
+        else:
+            print(f"-> {kind}")
+
+
+if __name__ == "__main__":
+    main()
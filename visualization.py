@@ -1,87 +1,211 @@
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
+from matplotlib import colormaps
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
 
+# Past this many routes the legend shows a single summary entry instead of one per route
+LEGEND_MAX_ROUTES = 20
 
-def plot_solution(solution, bks=None, name="Instance", save_path=None, show=True):
-    """
-    Visualizes the CVRP solution using Matplotlib.
 
-    Args:
-        solution: The CVRPSolution object.
-        bks: (Optional) Best Known Solution cost (float) to calculate Gap.
-        name: Name of the instance (string).
-        save_path: (Optional) Filepath to save the image (e.g., 'result.png').
-        show: Whether to display the plot window (True/False).
+def _draw_solution(fig, coords, depot, routes, cost, bks=None, name="Instance", legend_max=LEGEND_MAX_ROUTES):
     """
-    instance = solution.instance
-    routes = solution.routes
-    depot_id = instance.depot
-    coords = instance.coords
-
-    # 1. Setup Figure
-    plt.figure(figsize=(12, 10))
-
-    # 2. Setup Colors (Use tab20 for distinct colors, cycle if > 20 routes)
-    cmap = plt.get_cmap("tab20")
-    colors = [cmap(i % 20) for i in range(len(routes))]
-
-    # 3. Plot Routes
-    for r_idx, route in enumerate(routes):
-        # Build the full path of coordinates: Depot -> Node1 -> ... -> NodeN -> Depot
-        path_ids = [depot_id] + route + [depot_id]
-
-        xs = [coords[uid][0] for uid in path_ids]
-        ys = [coords[uid][1] for uid in path_ids]
-
-        color = colors[r_idx]
-
-        # Plot the Line (Edges)
-        plt.plot(xs, ys, color=color, linewidth=1.5, alpha=0.7, zorder=1)
-
-        # Plot the Customers (Nodes) - Exclude depot from this scatter
-        # We slice [1:-1] to skip the first and last point (which are the depot)
-        plt.scatter(xs[1:-1], ys[1:-1], color=color, edgecolors='black', s=80, zorder=2,
-                    label=f"Route {r_idx + 1} ({len(route)} customers)")
-
-    # 4. Plot Depot (Red Square)
-    dx, dy = coords[depot_id]
-    plt.scatter([dx], [dy], color='red', marker='s', s=200, edgecolors='black',
-                linewidth=2, label='Depot', zorder=10)
-
-    # 5. Determine Title & Metrics
-    total_dist = solution.cost
+    Draws a solution on a Figure with one LineCollection for all route edges
+    and one scatter for all customers, so the cost does not grow with the
+    number of artists. Only uses the object-oriented API (no pyplot state).
+    """
+    if np.isnan(coords).any():
+        raise ValueError(f"Cannot plot {name}: the instance has no node coordinates.")
+    routes = [r for r in routes if r]
+    ax = fig.add_subplot(1, 1, 1)
+
+    # Use tab20 for distinct colors, cycle if > 20 routes
+    colors = colormaps["tab20"](np.arange(len(routes)) % 20)
+
+    # Edges: Depot -> Node1 -> ... -> NodeN -> Depot, one polyline per route
+    paths = [coords[[depot] + route + [depot]] for route in routes]
+    ax.add_collection(LineCollection(paths, colors=colors, linewidths=1.5, alpha=0.7, zorder=1))
+
+    # Customers: one scatter, each point colored by its route
+    if routes:
+        nodes = np.concatenate([np.asarray(r) for r in routes])
+        point_colors = np.repeat(colors, [len(r) for r in routes], axis=0)
+        ax.scatter(coords[nodes, 0], coords[nodes, 1], c=point_colors, edgecolors='black', s=80, zorder=2)
+
+    # Depot (Red Square)
+    dx, dy = coords[depot]
+    ax.scatter([dx], [dy], color='red', marker='s', s=200, edgecolors='black', linewidth=2, zorder=10)
+    ax.autoscale_view()
+
+    # Title & Metrics
     gap_str = ""
     bks_str = ""
-
     if bks:
-        gap = ((total_dist - bks) / bks) * 100
+        gap = ((cost - bks) / bks) * 100
         gap_str = f" | Gap: {gap:.2f}%"
         bks_str = f" | Best-known: {bks:.2f}"
 
-    main_title = f"{name} - VNS Solution\nVNS Distance: {total_dist:.2f}{bks_str}{gap_str}"
-    subtitle = f"Routes: {len(routes)}"
+    main_title = f"{name} - VNS Solution\nVNS Distance: {cost:.2f}{bks_str}{gap_str}"
+    ax.set_title(f"{main_title}\nRoutes: {len(routes)}", fontsize=14, fontweight='bold')
+    ax.set_xlabel("X Coordinate", fontsize=12)
+    ax.set_ylabel("Y Coordinate", fontsize=12)
+    ax.grid(True, linestyle='-', alpha=0.3)
+
+    # Legend from proxy artists: one entry per route, or a summary past legend_max
+    def marker(color, **kw):
+        return Line2D([], [], linestyle='', marker=kw.pop('marker', 'o'), markerfacecolor=color,
+                      markeredgecolor='black', **kw)
+
+    if len(routes) <= legend_max:
+        handles = [marker(colors[i], markersize=9) for i in range(len(routes))]
+        labels = [f"Route {i + 1} ({len(r)} customers)" for i, r in enumerate(routes)]
+    else:
+        sizes = [len(r) for r in routes]
+        handles = [marker(colors[0], markersize=9)]
+        labels = [f"{len(routes)} routes ({min(sizes)}-{max(sizes)} customers)"]
+    handles.append(marker('red', marker='s', markersize=14, markeredgewidth=2))
+    labels.append("Depot")
+    ax.legend(handles, labels, loc='lower left', fontsize=9, framealpha=0.9, fancybox=True)
+
+    fig.tight_layout()
+
+
+def render_solution(solution, save_path, bks=None, name="Instance", dpi=150, legend_max=LEGEND_MAX_ROUTES):
+    """Renders a solution straight to an image file on a headless Agg canvas."""
+    instance = solution.instance
+    _render(instance.coord_array, instance.depot_idx, solution.routes, solution.cost, bks, name,
+            save_path, dpi, legend_max)
+    return save_path
 
-    plt.title(f"{main_title}\n{subtitle}", fontsize=14, fontweight='bold')
-    plt.xlabel("X Coordinate", fontsize=12)
-    plt.ylabel("Y Coordinate", fontsize=12)
 
-    # 6. Styling
-    plt.grid(True, linestyle='-', alpha=0.3)
+def _render(coords, depot, routes, cost, bks, name, save_path, dpi, legend_max):
+    fig = Figure(figsize=(12, 10))
+    FigureCanvasAgg(fig)
+    _draw_solution(fig, coords, depot, routes, cost, bks, name, legend_max)
+    fig.savefig(save_path, dpi=dpi)
+    return save_path
 
-    # Legend settings (outside or inside depending on preference, here bottom-left like reference)
-    plt.legend(loc='lower left', fontsize=9, framealpha=0.9, fancybox=True)
 
-    # Adjust layout to prevent cutting off labels
-    plt.tight_layout()
+def plot_solution(solution, bks=None, name="Instance", save_path=None, show=True, dpi=300,
+                  legend_max=LEGEND_MAX_ROUTES):
+    """
+    Visualizes the CVRP solution using Matplotlib.
+
+    Args:
+        solution: The CVRPSolution object.
+        bks: (Optional) Best Known Solution cost (float) to calculate Gap.
+        name: Name of the instance (string).
+        save_path: (Optional) Filepath to save the image (e.g., 'result.png').
+        show: Whether to display the plot window (True/False).
+        dpi: Resolution of the saved image.
+        legend_max: Routes listed individually in the legend before it collapses to a summary.
+    """
+    if not show:
+        if save_path:
+            render_solution(solution, save_path, bks, name, dpi, legend_max)
+            print(f"-> Plot saved to {save_path}")
+        return
+
+    # Only the interactive window needs pyplot
+    import matplotlib.pyplot as plt
 
-    # 7. Save or Show
+    instance = solution.instance
+    fig = plt.figure(figsize=(12, 10))
+    _draw_solution(fig, instance.coord_array, instance.depot_idx, solution.routes, solution.cost, bks, name,
+                   legend_max)
     if save_path:
-        plt.savefig(save_path, dpi=300)
+        fig.savefig(save_path, dpi=dpi)
         print(f"-> Plot saved to {save_path}")
-
-    if show:
-        plt.show()
+    plt.show()
 
     # Close to free memory if running in a loop
-    plt.close()
\ No newline at end of file
+    plt.close(fig)
+
+
+# =========================================================================
+#  BATCH RENDERING
+# =========================================================================
+def _render_job(job):
+    return _render(*job)
+
+
+def render_batch(items, workers=None, dpi=150, legend_max=LEGEND_MAX_ROUTES):
+    """
+    Renders many solutions across a process pool. items is an iterable of
+    (solution, save_path, bks, name) tuples; only coordinates and routes are
+    shipped to the workers, not the distance matrices. Returns the saved paths.
+    """
+    jobs = [(s.instance.coord_array, s.instance.depot_idx, s.routes, s.cost, bks, name, path, dpi, legend_max)
+            for s, path, bks, name in items]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_job, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+
+def _sol_job(vrp_path, sol_path, out_dir, dpi, legend_max):
+    # Loads and renders in the worker, so only file paths cross process boundaries
+    from CVRP_Instance import CVRPInstance
+    from solution_io import read_sol, solution_from_sol
+
+    instance = CVRPInstance(vrp_path)
+    solution = solution_from_sol(instance, sol_path)
+    bks_path = os.path.splitext(vrp_path)[0] + ".sol"
+    bks = read_sol(bks_path)[1] if os.path.exists(bks_path) else None
+    save_path = os.path.join(out_dir, f"{instance.name}.png")
+    return render_solution(solution, save_path, bks, instance.name, dpi, legend_max)
+
+
+def render_sol_files(vrp_paths, out_dir="visualizations", sol_dir=None, workers=None, dpi=150,
+                     legend_max=LEGEND_MAX_ROUTES):
+    """
+    Renders the .sol solution of every instance into out_dir/<name>.png. The
+    solutions are read from sol_dir/<name>.sol, or next to the .vrp file (the
+    best-known solutions) when sol_dir is None. Instances without a solution
+    file are skipped.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = []
+    for vrp_path in vrp_paths:
+        stem = os.path.splitext(os.path.basename(vrp_path))[0]
+        sol_path = os.path.join(sol_dir, stem + ".sol") if sol_dir else os.path.splitext(vrp_path)[0] + ".sol"
+        if os.path.exists(sol_path):
+            tasks.append((vrp_path, sol_path, out_dir, dpi, legend_max))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        return [_sol_job(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_sol_job, *zip(*tasks)))
+
+
+def main():
+    import argparse
+    import time
+
+    from batch_runner import collect_instances
+
+    parser = argparse.ArgumentParser(description="Render .sol solutions of many instances to PNG files")
+    parser.add_argument("instances", nargs="+", help="Instance files or glob patterns")
+    parser.add_argument("--sol-dir", type=str, default=None,
+                        help="Directory with <instance>.sol solutions (default: the .sol next to each .vrp)")
+    parser.add_argument("--out", "-o", type=str, default="visualizations", help="Output directory")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Rendering processes (default: all cores)")
+    parser.add_argument("--dpi", type=int, default=150, help="Image resolution")
+    parser.add_argument("--legend-max", type=int, default=LEGEND_MAX_ROUTES,
+                        help="Collapse the legend to one summary entry past this many routes")
+    args = parser.parse_args()
+
+    t0 = time.time()
+    saved = render_sol_files(collect_instances(args.instances), args.out, args.sol_dir, args.workers, args.dpi,
+                             args.legend_max)
+    print(f"-> Rendered {len(saved)} solutions to {args.out}/ in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,332 +1,840 @@
 import random
 import time
-from initial_solution import solve_nearest_neighbor
+from collections import deque
+from adaptive import AdaptiveWeights
+from batched_moves import PairMoveEvaluator
+from giant_tour import split_improve
+from initial_solution import CVRPSolution, CONSTRUCTIVE_HEURISTICS
+from recreate import recreate_with_cache
+from ruin_operators import RUIN_OPERATORS, parse_ruin_spec
+from solution_cache import LocalOptimumCache, canonical_hash
+from solution_io import write_sol
+
+# Recreate strategies: "random" inserts removed nodes one by one in random
+# order; the others use the cached insertion table (regret_k=1 is greedy).
+RECREATE_REGRET_K = {"greedy": 1, "regret2": 2, "regret3": 3}
+
+# Ruin sizes (fraction of the customers) the adaptive schedule chooses from;
+# the fixed schedule uses the first and switches to the second when stuck.
+RUIN_SIZES = (0.10, 0.30)
+
+# Neighborhoods whose don't-look bits are kept per route instead of per node
+PAIR_OPERATORS = ("relocate-pair", "swap-pair")
 
 
 class VNSSolver:
-    def __init__(self, instance, max_iterations=2000, max_seconds=600):
+    def __init__(self, instance, max_iterations=2000, max_seconds=600, neighbor_k=30, granular_beta=None,
+                 exchange=None, exchange_interval=10.0, verbose=True, stats=None, recreate="random",
+                 ruin="random", checkpoint_path=None, checkpoint_interval=30.0, init="nn",
+                 pair_moves=False, vectorized=True, target_cost=None, stall_limit=None,
+                 ls_cache_size=10000, stop_event=None, adaptive=False, split=False):
         self.instance = instance
         self.max_iterations = max_iterations
         self.max_seconds = max_seconds
+        # Extra stop criteria: best cost at or below target_cost, or stall_limit
+        # iterations without a new best. stop_reason tells which one ended solve().
+        self.target_cost = target_cost
+        self.stall_limit = stall_limit
+        self.stop_reason = None
+        self.verbose = verbose
+        if recreate != "random" and recreate not in RECREATE_REGRET_K:
+            raise ValueError(f"Unknown recreate strategy '{recreate}'.")
+        self.recreate = recreate
+        if init not in CONSTRUCTIVE_HEURISTICS:
+            raise ValueError(f"Unknown initial solution heuristic '{init}'.")
+        self.init = init
+
+        # Ruin operators (see ruin_operators.RUIN_OPERATORS), e.g. "sisr" or
+        # "sisr:3,radial:1"; one is drawn per iteration by weight.
+        self.ruin_names, self.ruin_weights = parse_ruin_spec(ruin)
+        # Monotonic clock; _deadline is checked cooperatively inside recreate and
+        # local search, so solve() returns within one operator scan of max_seconds
         self.start_time = 0
+        self._deadline = 0
+        self._expired = False
+        # External cancellation: anything with is_set() (e.g. a threading.Event);
+        # once set the search winds down exactly as at the deadline
+        self.stop_event = stop_event
+        self._cancelled = False
         self.best_solution = None
 
-    def solve(self):
-        self.start_time = time.time()
-        print("--> Generating Initial Solution...")
-        current_sol = solve_nearest_neighbor(self.instance)
-        # Ensure cost is fresh
-        current_sol.cost = current_sol.compute_total_cost()
+        # Run statistics (filled by solve()); history holds the anytime curve
+        # as (elapsed seconds, iteration, best cost) at every new best
+        self.iterations = 0
+        self.time_to_best = 0.0
+        self.elapsed = 0.0
+        self.history = []
+
+        # Island model hook: every exchange_interval seconds exchange(best_solution)
+        # is called and may return (cost, routes) of an immigrant elite solution.
+        self.exchange = exchange
+        self.exchange_interval = exchange_interval
+
+        # Periodic checkpoint: the incumbent is written as a .sol file (atomically)
+        # at most every checkpoint_interval seconds when it improved, and at the end.
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self._checkpoint_cost = float('inf')
+
+        # Visited local optima (solution_cache): canonical hash of post-recreate
+        # states and local optima -> cost of the local optimum reached; 0 disables
+        self.ls_cache = LocalOptimumCache(ls_cache_size) if ls_cache_size else None
+
+        # Split step (giant_tour.split_improve): after every recreate the routes
+        # are chained by angle into a giant tour and its route boundaries are
+        # re-optimized in linear time before the local search
+        self.split = split
+
+        # Optional instrumentation.SearchStats; None keeps the plain (untimed) paths
+        self.stats = stats
+        self._evals = 0
+
+        # VND neighborhoods, cheapest/fastest first. Names key the don't-look bits
+        # and the instrumentation.
+        self.operators = [
+            ("2opt", self._2opt_intra_fast),
+            ("2opt*", self._2opt_star_fast),
+            ("relocate2", lambda sol: self._relocate_chain(sol, 2)),
+            ("relocate1", lambda sol: self._relocate_chain(sol, 1)),
+            ("swap", self._swap_fast),
+        ]
+
+        # Optional exhaustive neighborhoods over pairs of routes joined by a
+        # candidate arc, after the granular ones. Deltas come from
+        # batched_moves.PairMoveEvaluator (numpy for long routes, Python otherwise).
+        self.pair_evaluator = None
+        if pair_moves:
+            self.pair_evaluator = PairMoveEvaluator(instance, vectorized=vectorized)
+            self.operators += [
+                ("relocate-pair", lambda sol: self._pair_moves(sol, "relocate-pair")),
+                ("swap-pair", lambda sol: self._pair_moves(sol, "swap-pair")),
+            ]
+
+        # Adaptive scheduling (adaptive.AdaptiveWeights): VND neighborhoods are
+        # tried in order of measured improvement per second, and every iteration
+        # draws its (ruin operator, ruin size) by roulette on the same measure.
+        # None keeps the fixed order and the no-improvement ruin size rule.
+        self.operator_schedule = None
+        self.ruin_schedule = None
+        if adaptive:
+            self.operator_schedule = AdaptiveWeights([name for name, _ in self.operators])
+            # Weights given in the ruin spec keep scaling the roulette, for every size
+            ruin_bias = {(name, pct): w for name, w in zip(self.ruin_names, self.ruin_weights) for pct in RUIN_SIZES}
+            self.ruin_schedule = AdaptiveWeights(list(ruin_bias), min_share=0.25, bias=ruin_bias)
+
+        # Don't-look bits (reset per _local_search): active[op] queues the nodes
+        # (routes, for the pair neighborhoods) op still has to scan, as (deque,
+        # in-queue flags). A move re-queues only the nodes of the routes it
+        # changed and the nodes with a candidate in them. route_stamp[r] is the
+        # clock of r's last modification and clean[op][u] the clock at which op
+        # last scanned u without an improving move, so a re-queued node skips
+        # the routes that did not change since.
+        self._clock = 0
+        self._route_stamp = []
+        self._clean = {}
+        self._active = {}
+
+        # Granular neighborhoods: operators only try moves that create at least
+        # one candidate arc (u, v) with v among the k nearest customers of u.
+        # granular_beta (optional) additionally drops candidate arcs longer than
+        # beta * average arc length of the initial solution (Toth & Vigo).
+        if neighbor_k < 1:
+            raise ValueError(f"neighbor_k must be at least 1, got {neighbor_k}.")
+        self.neighbor_k = neighbor_k
+        self.granular_beta = granular_beta
+        self.candidates = []
+        self.reverse_candidates = []
+        if instance.neighbor_k != neighbor_k:
+            instance.compute_neighbors(neighbor_k)
+
+    def solve(self, initial_solution=None):
+        self.start_time = time.monotonic()
+        self._deadline = self.start_time + self.max_seconds
+        self._expired = False
+        self._cancelled = False
+        self.stop_reason = "iterations"
+        if initial_solution is not None:
+            # Warm start (e.g. solution_io.solution_from_sol); the caller's copy is left untouched
+            self._log("--> Using Warm Start Solution...")
+            current_sol = initial_solution.clone()
+        else:
+            self._log(f"--> Generating Initial Solution ({self.init})...")
+            current_sol = CONSTRUCTIVE_HEURISTICS[self.init](self.instance, should_stop=self._time_up)
+        self._build_candidates(current_sol)
 
         self.best_solution = current_sol.clone()
-        print(f"--> Initial Cost: {current_sol.cost:.2f}")
+        self.history = [(time.monotonic() - self.start_time, 0, current_sol.cost)]
+        self._log(f"--> Initial Cost: {current_sol.cost:.2f}")
 
         iteration = 0
         no_improv_iter = 0
+        last_best_iter = 0
+        next_exchange = self.start_time + self.exchange_interval
+        next_checkpoint = self.start_time + self.checkpoint_interval
 
         # Base percentage for Ruin
-        pct_remove_base = 0.10
+        pct_remove_base = RUIN_SIZES[0]
 
         while iteration < self.max_iterations:
-            if self._check_time():
-                print("\n[STOP] Time limit reached.")
+            if self._time_up():
+                self._stop_at_deadline()
+                break
+            if self.target_cost is not None and self.best_solution.cost <= self.target_cost + 0.001:
+                self.stop_reason = "target"
+                self._log(f"\n[STOP] Target cost {self.target_cost:.2f} reached.")
                 break
+            if self.stall_limit is not None and iteration - last_best_iter >= self.stall_limit:
+                self.stop_reason = "stall"
+                self._log(f"\n[STOP] No improvement in {self.stall_limit} iterations.")
+                break
+
+            if self.exchange is not None and time.monotonic() >= next_exchange:
+                next_exchange = time.monotonic() + self.exchange_interval
+                immigrant = self.exchange(self.best_solution)
+                if immigrant is not None and immigrant[0] < current_sol.cost - 0.001:
+                    current_sol = CVRPSolution(self.instance, [list(r) for r in immigrant[1]])
+                    no_improv_iter = 0
+                    if current_sol.cost < self.best_solution.cost - 0.001:
+                        self._record_best(current_sol, iteration)
+                        last_best_iter = iteration
+
+            if self.checkpoint_path and time.monotonic() >= next_checkpoint:
+                next_checkpoint = time.monotonic() + self.checkpoint_interval
+                self._save_checkpoint()
 
             iteration += 1
 
-            # Clone for the new iteration
-            candidate_sol = current_sol.clone()
+            # The candidate is built in place on the incumbent; a rejected one is
+            # undone via the undo log instead of paying for a full clone up front.
+            cost_before = current_sol.cost
+            current_sol.checkpoint()
 
             # --- SHAKING: Ruin & Recreate ---
-            # Increase ruin severity if we are stuck (Adaptive)
-            current_pct = 0.30 if no_improv_iter > 50 else pct_remove_base
+            if self.ruin_schedule is not None:
+                ruin_setting = self.ruin_schedule.choose()
+                ruin_name, current_pct = ruin_setting
+            else:
+                # Increase ruin severity if we are stuck
+                ruin_name = None
+                current_pct = RUIN_SIZES[1] if no_improv_iter > 50 else pct_remove_base
 
             # Robustness: Use len(nodes) - 1 (assuming 1 depot) for safe count
             num_customers = len(self.instance.nodes) - 1
             num_to_remove = int(max(4, num_customers * current_pct))
 
-            self._shaking_ruin_recreate(candidate_sol, num_to_remove)
+            t_shake = time.perf_counter()
+            if not self._shaking_ruin_recreate(current_sol, num_to_remove, ruin_name):
+                # Deadline hit mid-recreate: drop the partial candidate
+                current_sol.rollback()
+                self._stop_at_deadline()
+                break
+            if self.split:
+                split_improve(current_sol)
 
             # --- LOCAL SEARCH (VND) ---
-            self._local_search(candidate_sol)
+            # A post-recreate state seen before leads to a known local optimum;
+            # with descent acceptance it is rejected without another VND pass.
+            t_ls = time.perf_counter()
+            state_key = known_cost = None
+            if self.ls_cache is not None:
+                state_key = canonical_hash(current_sol.routes)
+                known_cost = self.ls_cache.get(state_key)
+
+            if known_cost is not None and known_cost >= cost_before - 0.001:
+                candidate_cost = known_cost
+                t_end = time.perf_counter()
+            else:
+                self._local_search(current_sol)
+                t_end = time.perf_counter()
 
-            # --- SAFETY RECOMPUTE ---
-            # Periodically fix float drift or logic gaps
-            candidate_sol.cost = candidate_sol.compute_total_cost()
+                # --- SAFETY RECOMPUTE ---
+                # Re-sum the cached route costs to clear float drift (no route re-walk)
+                current_sol.cost = current_sol.compute_total_cost()
+                candidate_cost = current_sol.cost
+
+                # A VND cut short by the deadline did not reach a local optimum
+                if self.ls_cache is not None and not self._expired:
+                    self.ls_cache.put(state_key, candidate_cost)
+                    self.ls_cache.put(canonical_hash(current_sol.routes), candidate_cost)
 
             # --- ACCEPTANCE ---
             # Standard Descent
-            if candidate_sol.cost < current_sol.cost - 0.001:
-                current_sol = candidate_sol
+            if candidate_cost < cost_before - 0.001:
+                current_sol.commit()
                 no_improv_iter = 0
 
                 if current_sol.cost < self.best_solution.cost - 0.001:
-                    self.best_solution = current_sol.clone()
-                    print(f"Iter {iteration}: New Best Cost = {self.best_solution.cost:.2f}")
+                    self._record_best(current_sol, iteration)
+                    last_best_iter = iteration
+                    self._log(f"Iter {iteration}: New Best Cost = {self.best_solution.cost:.2f}")
             else:
+                current_sol.rollback()
                 no_improv_iter += 1
 
+            if self.ruin_schedule is not None:
+                self.ruin_schedule.update(ruin_setting, cost_before - current_sol.cost, t_end - t_shake)
+
+            if self.stats is not None:
+                self.stats.record_iteration(iteration, t_ls - t_shake, t_end - t_ls, candidate_cost,
+                                            current_sol.cost, self.best_solution.cost)
+
+        self.iterations = iteration
+        self.elapsed = time.monotonic() - self.start_time
+        if self.checkpoint_path:
+            self._save_checkpoint()
         return self.best_solution
 
-    def _check_time(self):
-        return (time.time() - self.start_time) > self.max_seconds
+    def _record_best(self, solution, iteration):
+        self.best_solution = solution.clone()
+        self.time_to_best = time.monotonic() - self.start_time
+        self.history.append((self.time_to_best, iteration, solution.cost))
+
+    def _save_checkpoint(self):
+        if self.best_solution.cost >= self._checkpoint_cost - 0.001:
+            return
+        try:
+            write_sol(self.checkpoint_path, self.best_solution)
+            self._checkpoint_cost = self.best_solution.cost
+        except OSError as e:
+            # A failing checkpoint should not stop the search
+            self._log(f"Warning: Could not write checkpoint ({e}).")
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _time_up(self):
+        # Cheap enough to call between moves; latched once the deadline passed
+        if not self._expired:
+            if time.monotonic() >= self._deadline:
+                self._expired = True
+            elif self.stop_event is not None and self.stop_event.is_set():
+                self._expired = self._cancelled = True
+        return self._expired
+
+    def _stop_at_deadline(self):
+        if self._cancelled:
+            self.stop_reason = "cancelled"
+            self._log("\n[STOP] Cancelled.")
+        else:
+            self.stop_reason = "time"
+            self._log("\n[STOP] Time limit reached.")
+
+    def _build_candidates(self, solution):
+        neighbors = self.instance.neighbors
+        if self.granular_beta is None:
+            self.candidates = neighbors
+        else:
+            # Average arc length of the starting solution (n customers + one depot arc per route)
+            num_arcs = sum(len(r) for r in solution.routes) + len(solution.routes)
+            threshold = self.granular_beta * solution.cost / max(1, num_arcs)
+            D = self.instance.dist_rows
+            self.candidates = [[v for v in vs if D[u][v] <= threshold] for u, vs in enumerate(neighbors)]
+
+        # reverse_candidates[v] = nodes that have v in their candidate list
+        self.reverse_candidates = [[] for _ in range(self.instance.num_nodes)]
+        for u, vs in enumerate(self.candidates):
+            for v in vs:
+                self.reverse_candidates[v].append(u)
 
     # =========================================================================
     #  RUIN AND RECREATE
     # =========================================================================
-    def _shaking_ruin_recreate(self, solution, num_to_remove):
-        routes = solution.routes
-
-        # Gather all customers (flatten routes)
-        all_customers = []
-        for r in routes:
-            all_customers.extend(r)
+    def _shaking_ruin_recreate(self, solution, num_to_remove, ruin_name=None):
+        num_routed = sum(len(r) for r in solution.routes)
 
         # Safety Guard: Empty solution or too small
-        if not all_customers:
-            return
+        if not num_routed:
+            return True
 
         # Limit removal to available customers
-        actual_remove = min(len(all_customers), num_to_remove)
+        actual_remove = min(num_routed, num_to_remove)
 
-        # RUIN: Random Removal
-        nodes_to_remove = set(random.sample(all_customers, actual_remove))
-
-        # Filter routes
-        for r in routes:
-            r[:] = [n for n in r if n not in nodes_to_remove]
+        # RUIN: pick an operator from the registry (unless the adaptive schedule did)
+        if ruin_name is None:
+            if len(self.ruin_names) == 1:
+                ruin_name = self.ruin_names[0]
+            else:
+                ruin_name = random.choices(self.ruin_names, weights=self.ruin_weights)[0]
+        nodes_to_remove = RUIN_OPERATORS[ruin_name](solution, actual_remove)
+        if not nodes_to_remove:
+            return True
 
-        # Clean empty routes
-        solution.routes = [r for r in routes if r]
+        # Filter touched routes and clean empty ones
+        solution.remove_nodes(nodes_to_remove)
 
         # RECREATE: Best Insertion
         # Shuffle to avoid deterministic insertion order
         removed_list = list(nodes_to_remove)
         random.shuffle(removed_list)
 
-        for node in removed_list:
-            self._best_insertion(solution, node)
-
-        # CRITICAL FIX: Recompute cost after Shaking modifications.
-        # Local search relies on incremental updates, so the base cost must be correct here.
-        solution.cost = solution.compute_total_cost()
+        # Returns False if the deadline passed before every node was reinserted
+        if self.recreate == "random":
+            for i, node in enumerate(removed_list):
+                if not i & 15 and self._time_up():
+                    return False
+                self._best_insertion(solution, node)
+            return True
+        return recreate_with_cache(solution, removed_list, self.candidates, self.reverse_candidates,
+                                   regret_k=RECREATE_REGRET_K[self.recreate], should_stop=self._time_up)
 
     def _best_insertion(self, solution, node):
         best_delta = float('inf')
         best_r_idx = -1
         best_pos_idx = -1
 
-        demand = self.instance.demands[node]
-        dist = self.instance.distance
-        depot = self.instance.depot
+        routes = solution.routes
+        loads = solution.loads
+        node_route = solution.node_route
+        node_pos = solution.node_pos
+        demand = self.instance.node_demands[node]
+        D = self.instance.dist_rows
+        depot = self.instance.depot_idx
         capacity = self.instance.capacity
 
         # Robustness: Impossible to insert if single node > capacity
         if demand > capacity:
             # In a strict solver, this should crash.
             # For a heuristic, we might skip, but let's raise to warn the user.
-            raise ValueError(f"Node {node} demand ({demand}) exceeds vehicle capacity ({capacity}).")
+            raise ValueError(f"Node {self.instance.nodes[node]} demand ({demand}) exceeds vehicle capacity ({capacity}).")
 
-        # 1. Try existing routes
-        for r_idx, route in enumerate(solution.routes):
-            load = sum(self.instance.demands[n] for n in route)
-            if load + demand > capacity: continue
+        # 1. Try positions next to routed candidate neighbors (before and after them)
+        for v in self.candidates[node]:
+            r_idx = node_route[v]
+            if r_idx < 0: continue
+            pos = node_pos[v]
+            if loads[r_idx] + demand > capacity: continue
 
-            for k in range(len(route) + 1):
+            route = routes[r_idx]
+            for k in (pos, pos + 1):
                 prev_n = route[k - 1] if k > 0 else depot
                 next_n = route[k] if k < len(route) else depot
 
-                delta = dist(prev_n, node) + dist(node, next_n) - dist(prev_n, next_n)
+                delta = D[prev_n][node] + D[node][next_n] - D[prev_n][next_n]
 
                 if delta < best_delta:
                     best_delta = delta
                     best_r_idx = r_idx
                     best_pos_idx = k
 
-        # 2. Try new route
-        delta_new = dist(depot, node) + dist(node, depot)
+        # 2. No feasible candidate position: fall back to scanning every route
+        if best_r_idx == -1:
+            for r_idx, route in enumerate(routes):
+                if loads[r_idx] + demand > capacity: continue
+
+                for k in range(len(route) + 1):
+                    prev_n = route[k - 1] if k > 0 else depot
+                    next_n = route[k] if k < len(route) else depot
+
+                    delta = D[prev_n][node] + D[node][next_n] - D[prev_n][next_n]
+
+                    if delta < best_delta:
+                        best_delta = delta
+                        best_r_idx = r_idx
+                        best_pos_idx = k
+
+        # 3. Try new route
+        delta_new = D[depot][node] + D[node][depot]
         if delta_new < best_delta:
             best_delta = delta_new
-            best_r_idx = len(solution.routes)
+            best_r_idx = len(routes)
             best_pos_idx = 0
 
-        # Apply Best Move
-        if best_r_idx == len(solution.routes):
-            solution.routes.append([node])
+        # Apply Best Move (keeps the cached route state and cost in sync)
+        if best_r_idx == len(routes):
+            solution.add_route([node])
         else:
-            solution.routes[best_r_idx].insert(best_pos_idx, node)
-
-        # Note: We do NOT update solution.cost here.
-        # We recompute it globally at the end of _shaking_ruin_recreate.
+            solution.insert(best_r_idx, best_pos_idx, node)
 
     # =========================================================================
     #  LOCAL SEARCH (VND)
     # =========================================================================
     def _local_search(self, solution):
+        # A move of u against a node of route r only needs re-evaluation if u's
+        # route or r changed since op last scanned u. Empty routes are kept in
+        # place until the end so route indices (and their stamps) stay valid.
+        self._reset_dont_look_bits(solution)
+
+        operators = self.operators
+        if self.operator_schedule is not None:
+            by_name = dict(operators)
+            operators = [(name, by_name[name]) for name in self.operator_schedule.order()]
+
+        timed = self.stats is not None or self.operator_schedule is not None
         improved = True
         while improved:
             improved = False
-            # Strategy: Cheapest/Fastest moves first
-            if self._2opt_intra_fast(solution): improved = True; continue
-            if self._2opt_star_fast(solution): improved = True; continue
-            if self._relocate_chain(solution, 2): improved = True; continue
-            if self._relocate_chain(solution, 1): improved = True; continue
-            if self._swap_fast(solution): improved = True; continue
+            # Restart from the first neighborhood after every improving move
+            for name, op in operators:
+                # Stopping between moves still leaves a complete, feasible solution
+                if self._time_up(): break
+                if not timed:
+                    improved = op(solution)
+                else:
+                    improved = self._timed_operator(name, op, solution)
+                if improved: break
+
+        solution.remove_empty_routes()
+
+    def _reset_dont_look_bits(self, solution):
+        # Every node and route counts as modified: the next call of each operator scans it all
+        self._clock = 1
+        self._route_stamp = [1] * len(solution.routes)
+        nodes = [u for route in solution.routes for u in route]
+        num_nodes = self.instance.num_nodes
+        num_routes = len(solution.routes)
+        self._clean = {}
+        self._active = {}
+        for name, _ in self.operators:
+            items = range(num_routes) if name in PAIR_OPERATORS else nodes
+            size = num_routes if name in PAIR_OPERATORS else num_nodes
+            self._clean[name] = [0] * size
+            self._active[name] = (deque(items), bytearray(b"\x01") * size)
+        if self.pair_evaluator is not None:
+            self.pair_evaluator.reset()
+
+    def _timed_operator(self, name, op, solution):
+        cost_before = solution.cost
+        t0 = time.perf_counter()
+        improved = op(solution)
+        elapsed = time.perf_counter() - t0
+        if self.stats is not None:
+            self.stats.record_operator(name, elapsed, self._evals, int(improved), solution.cost - cost_before)
+        if self.operator_schedule is not None:
+            self.operator_schedule.update(name, cost_before - solution.cost, elapsed)
+        return improved
+
+    def _touch(self, solution, *r_indices):
+        self._clock += 1
+        routes = solution.routes
+        moved = []
+        for r_idx in r_indices:
+            self._route_stamp[r_idx] = self._clock
+            moved.extend(routes[r_idx])
+        # Inter-route moves of u are evaluated against the routes of u's candidates
+        reverse = self.reverse_candidates
+        around = [u for v in moved for u in reverse[v]]
+        around_routes = None
+
+        for name, (queue, queued) in self._active.items():
+            if name in PAIR_OPERATORS:
+                if around_routes is None:
+                    node_route = solution.node_route
+                    around_routes = sorted(set(r_indices).union(node_route[u] for u in around))
+                items = around_routes
+            elif name == "2opt":
+                items = moved
+            else:
+                items = moved + around
+            for item in items:
+                if not queued[item]:
+                    queued[item] = 1
+                    queue.append(item)
 
-    # --- OPERATORS (Delta O(1)) ---
+    # --- OPERATORS (Delta O(1), granular: only moves creating a candidate arc) ---
 
     def _2opt_intra_fast(self, solution):
-        dist = self.instance.distance
-        depot = self.instance.depot
-
-        for r_idx, route in enumerate(solution.routes):
+        D = self.instance.dist_rows
+        depot = self.instance.depot_idx
+        candidates = self.candidates
+        node_route = solution.node_route
+        node_pos = solution.node_pos
+        clean = self._clean["2opt"]
+        queue, queued = self._active["2opt"]
+        clock = self._clock
+        evals = 0
+
+        while queue:
+            a = queue.popleft()
+            queued[a] = 0
+            r_idx = node_route[a]
+            route = solution.routes[r_idx]
             n = len(route)
-            if n < 2: continue
-
-            for i in range(-1, n - 2):
-                u = depot if i == -1 else route[i]
-                v = route[i + 1]
-                for j in range(i + 1, n):
-                    if j == n - 1 and i == -1: continue
-
-                    x = route[j]
-                    y = depot if j == n - 1 else route[j + 1]
-
-                    delta = (dist(u, x) + dist(v, y)) - (dist(u, v) + dist(x, y))
+            # Intra-route moves only depend on the route itself
+            if n >= 3 and clean[a] < self._route_stamp[r_idx]:
+                p = node_pos[a]
+                for b in candidates[a]:
+                    if node_route[b] != r_idx: continue
+                    q = node_pos[b]
+
+                    lo, hi = (p, q) if p < q else (q, p)
+                    # Reversing route[s..e] creates arc (route[lo], route[hi]) either
+                    # as (u, x) with s = lo + 1, e = hi or as (v, y) with s = lo, e = hi - 1.
+                    for s, e in ((lo + 1, hi), (lo, hi - 1)):
+                        if e - s < 1: continue
+
+                        prev_n = route[s - 1] if s > 0 else depot
+                        next_n = route[e + 1] if e < n - 1 else depot
+
+                        evals += 1
+                        delta = (D[prev_n][route[e]] + D[route[s]][next_n]) - \
+                                (D[prev_n][route[s]] + D[route[e]][next_n])
 
-                    if delta < -0.001:
-                        solution.routes[r_idx][i + 1:j + 1] = reversed(solution.routes[r_idx][i + 1:j + 1])
-                        solution.cost += delta
-                        return True
+                        if delta < -0.001:
+                            solution.set_route(r_idx, route[:s] + route[s:e + 1][::-1] + route[e + 1:])
+                            self._touch(solution, r_idx)
+                            self._evals = evals
+                            return True
+            clean[a] = clock
+        self._evals = evals
         return False
 
     def _2opt_star_fast(self, solution):
         routes = solution.routes
-        dist = self.instance.distance
-        depot = self.instance.depot
-        demands = self.instance.demands
+        D = self.instance.dist_rows
+        depot = self.instance.depot_idx
         capacity = self.instance.capacity
-
-        # Precompute loads helps slightly with speed
-        loads = [sum(demands[n] for n in r) for r in routes]
-
-        for r1_idx in range(len(routes)):
-            for r2_idx in range(r1_idx + 1, len(routes)):
-                r1, r2 = routes[r1_idx], routes[r2_idx]
-
-                # Split R1 after i
-                for i in range(-1, len(r1)):
-                    load_r1_head = sum(demands[r1[x]] for x in range(i + 1)) if i >= 0 else 0
-                    load_r1_tail = loads[r1_idx] - load_r1_head
+        candidates = self.candidates
+        node_route = solution.node_route
+        node_pos = solution.node_pos
+        head_loads = solution.prefix_loads
+        stamp = self._route_stamp
+        clean = self._clean["2opt*"]
+        queue, queued = self._active["2opt*"]
+        clock = self._clock
+        evals = 0
+
+        while queue:
+            a = queue.popleft()
+            queued[a] = 0
+            r1_idx = node_route[a]
+            r1 = routes[r1_idx]
+            p = node_pos[a]
+            seen = clean[a]
+            own_changed = stamp[r1_idx] > seen
+
+            for b in candidates[a]:
+                r2_idx = node_route[b]
+                if r2_idx == r1_idx: continue
+                if not own_changed and stamp[r2_idx] <= seen: continue
+                q = node_pos[b]
+                r2 = routes[r2_idx]
+
+                # Split r1 after i and r2 after j. Either the new arc is (a, b)
+                # (a ends r1's head, b starts r2's tail) or (b, a).
+                for i, j in ((p, q - 1), (p - 1, q)):
+                    if i == len(r1) - 1 and j == len(r2) - 1: continue
+                    if i == -1 and j == -1: continue
+
+                    h1 = head_loads[r1_idx]
+                    h2 = head_loads[r2_idx]
+                    load_r1_head = h1[i + 1]
+                    load_r2_head = h2[j + 1]
+                    if load_r1_head + h2[-1] - load_r2_head > capacity: continue
+                    if load_r2_head + h1[-1] - load_r1_head > capacity: continue
 
                     u = r1[i] if i >= 0 else depot
                     u_next = r1[i + 1] if i < len(r1) - 1 else depot
+                    v = r2[j] if j >= 0 else depot
+                    v_next = r2[j + 1] if j < len(r2) - 1 else depot
 
-                    # Split R2 after j
-                    for j in range(-1, len(r2)):
-                        if i == -1 and j == -1: continue
-
-                        load_r2_head = sum(demands[r2[x]] for x in range(j + 1)) if j >= 0 else 0
-                        load_r2_tail = loads[r2_idx] - load_r2_head
+                    evals += 1
+                    old_cost = D[u][u_next] + D[v][v_next]
+                    new_cost = D[u][v_next] + D[v][u_next]
+                    delta = new_cost - old_cost
 
-                        if load_r1_head + load_r2_tail > capacity: continue
-                        if load_r2_head + load_r1_tail > capacity: continue
-
-                        v = r2[j] if j >= 0 else depot
-                        v_next = r2[j + 1] if j < len(r2) - 1 else depot
-
-                        old_cost = dist(u, u_next) + dist(v, v_next)
-                        new_cost = dist(u, v_next) + dist(v, u_next)
-                        delta = new_cost - old_cost
-
-                        if delta < -0.001:
-                            new_r1 = r1[:i + 1] + r2[j + 1:]
-                            new_r2 = r2[:j + 1] + r1[i + 1:]
-                            routes[r1_idx] = new_r1
-                            routes[r2_idx] = new_r2
-                            solution.cost += delta
-                            # If a route became empty, cleanup
-                            solution.routes = [r for r in routes if r]
-                            return True
+                    if delta < -0.001:
+                        new_r1 = r1[:i + 1] + r2[j + 1:]
+                        new_r2 = r2[:j + 1] + r1[i + 1:]
+                        solution.set_route(r1_idx, new_r1)
+                        solution.set_route(r2_idx, new_r2)
+                        self._touch(solution, r1_idx, r2_idx)
+                        self._evals = evals
+                        return True
+            clean[a] = clock
+        self._evals = evals
         return False
 
     def _relocate_chain(self, solution, chain_len):
         routes = solution.routes
-        dist = self.instance.distance
-        depot = self.instance.depot
-        demands = self.instance.demands
+        D = self.instance.dist_rows
+        depot = self.instance.depot_idx
         capacity = self.instance.capacity
-        loads = [sum(demands[n] for n in r) for r in routes]
-
-        for s_idx, src in enumerate(routes):
-            if len(src) < chain_len: continue
-
-            for i in range(len(src) - chain_len + 1):
+        candidates = self.candidates
+        loads = solution.loads
+        node_route = solution.node_route
+        node_pos = solution.node_pos
+        stamp = self._route_stamp
+        name = f"relocate{chain_len}"
+        clean = self._clean[name]
+        queue, queued = self._active[name]
+        clock = self._clock
+        evals = 0
+
+        while queue:
+            w = queue.popleft()
+            queued[w] = 0
+            s_idx = node_route[w]
+            src = routes[s_idx]
+            seen = clean[w]
+            own_changed = stamp[s_idx] > seen
+
+            # w's candidates are tried for the chain it starts and the chain it
+            # ends; the latter is left to its head when that is scanned anyway
+            pos = node_pos[w]
+            starts = [pos]
+            head = pos - chain_len + 1
+            if chain_len > 1 and head >= 0 and not queued[src[head]] and clean[src[head]] < clock:
+                starts.append(head)
+
+            for i in starts:
+                if i + chain_len > len(src): continue
                 chain = src[i:i + chain_len]
-                chain_load = sum(demands[n] for n in chain)
+                chain_load = solution.prefix_loads[s_idx][i + chain_len] - solution.prefix_loads[s_idx][i]
 
                 prev_s = src[i - 1] if i > 0 else depot
                 next_s = src[i + chain_len] if i + chain_len < len(src) else depot
 
-                loss = dist(prev_s, next_s) - (dist(prev_s, chain[0]) + dist(chain[-1], next_s))
+                loss = D[prev_s][next_s] - (D[prev_s][chain[0]] + D[chain[-1]][next_s])
 
-                for d_idx, dst in enumerate(routes):
-                    if s_idx == d_idx: continue
-                    if loads[d_idx] + chain_load > capacity: continue
+                best_delta_insert = float('inf')
+                best_d_idx = -1
+                best_k = -1
 
-                    best_delta_insert = float('inf')
-                    best_k = -1
+                # Insert right after a neighbor of the chain head, or right before
+                # a neighbor of the chain tail.
+                for end, offset in ((chain[0], 1), (chain[-1], 0)):
+                    for b in candidates[end]:
+                        d_idx = node_route[b]
+                        if d_idx == s_idx: continue
+                        if not own_changed and stamp[d_idx] <= seen: continue
+                        if loads[d_idx] + chain_load > capacity: continue
 
-                    for k in range(len(dst) + 1):
+                        dst = routes[d_idx]
+                        k = node_pos[b] + offset
                         prev_d = dst[k - 1] if k > 0 else depot
                         next_d = dst[k] if k < len(dst) else depot
 
-                        gain = (dist(prev_d, chain[0]) + dist(chain[-1], next_d)) - dist(prev_d, next_d)
+                        evals += 1
+                        gain = (D[prev_d][chain[0]] + D[chain[-1]][next_d]) - D[prev_d][next_d]
 
                         if gain < best_delta_insert:
                             best_delta_insert = gain
+                            best_d_idx = d_idx
                             best_k = k
 
-                    total_delta = loss + best_delta_insert
-
-                    if total_delta < -0.001:
-                        del src[i:i + chain_len]
-                        dst[best_k:best_k] = chain
-                        solution.cost += total_delta
-                        if not src: routes.pop(s_idx)
-                        return True
+                total_delta = loss + best_delta_insert
+
+                if total_delta < -0.001:
+                    dst = routes[best_d_idx]
+                    solution.set_route(s_idx, src[:i] + src[i + chain_len:])
+                    solution.set_route(best_d_idx, dst[:best_k] + chain + dst[best_k:])
+                    self._touch(solution, s_idx, best_d_idx)
+                    self._evals = evals
+                    return True
+            clean[w] = clock
+        self._evals = evals
         return False
 
     def _swap_fast(self, solution):
         routes = solution.routes
-        dist = self.instance.distance
-        depot = self.instance.depot
-        demands = self.instance.demands
+        D = self.instance.dist_rows
+        depot = self.instance.depot_idx
+        demands = self.instance.node_demands
         capacity = self.instance.capacity
-        loads = [sum(demands[n] for n in r) for r in routes]
-
-        for r1_idx in range(len(routes)):
-            for r2_idx in range(r1_idx + 1, len(routes)):
-                r1, r2 = routes[r1_idx], routes[r2_idx]
-                l1, l2 = loads[r1_idx], loads[r2_idx]
-
-                for i, u in enumerate(r1):
-                    du = demands[u]
-                    up = r1[i - 1] if i > 0 else depot
-                    un = r1[i + 1] if i < len(r1) - 1 else depot
-
-                    for j, v in enumerate(r2):
-                        dv = demands[v]
-                        if l1 - du + dv > capacity or l2 - dv + du > capacity: continue
-
-                        vp = r2[j - 1] if j > 0 else depot
-                        vn = r2[j + 1] if j < len(r2) - 1 else depot
-
-                        old_cost = dist(up, u) + dist(u, un) + dist(vp, v) + dist(v, vn)
-                        new_cost = dist(up, v) + dist(v, un) + dist(vp, u) + dist(u, vn)
+        candidates = self.candidates
+        loads = solution.loads
+        node_route = solution.node_route
+        node_pos = solution.node_pos
+        stamp = self._route_stamp
+        clean = self._clean["swap"]
+        queue, queued = self._active["swap"]
+        clock = self._clock
+        evals = 0
+
+        while queue:
+            u = queue.popleft()
+            queued[u] = 0
+            r1_idx = node_route[u]
+            r1 = routes[r1_idx]
+            l1 = loads[r1_idx]
+            i = node_pos[u]
+            seen = clean[u]
+            own_changed = stamp[r1_idx] > seen
+
+            du = demands[u]
+            up = r1[i - 1] if i > 0 else depot
+            un = r1[i + 1] if i < len(r1) - 1 else depot
+
+            # Move u next to its neighbor b by swapping it with b's predecessor
+            # or successor.
+            for b in candidates[u]:
+                r2_idx = node_route[b]
+                if r2_idx == r1_idx: continue
+                if not own_changed and stamp[r2_idx] <= seen: continue
+                q = node_pos[b]
+                r2 = routes[r2_idx]
+                l2 = loads[r2_idx]
+
+                for j in (q - 1, q + 1):
+                    if j < 0 or j >= len(r2): continue
+                    v = r2[j]
+                    dv = demands[v]
+                    if l1 - du + dv > capacity or l2 - dv + du > capacity: continue
+
+                    vp = r2[j - 1] if j > 0 else depot
+                    vn = r2[j + 1] if j < len(r2) - 1 else depot
+
+                    evals += 1
+                    old_cost = D[up][u] + D[u][un] + D[vp][v] + D[v][vn]
+                    new_cost = D[up][v] + D[v][un] + D[vp][u] + D[u][vn]
+
+                    if new_cost - old_cost < -0.001:
+                        solution.set_route(r1_idx, r1[:i] + [v] + r1[i + 1:])
+                        solution.set_route(r2_idx, r2[:j] + [u] + r2[j + 1:])
+                        self._touch(solution, r1_idx, r2_idx)
+                        self._evals = evals
+                        return True
+            clean[u] = clock
+        self._evals = evals
+        return False
 
-                        if new_cost - old_cost < -0.001:
-                            r1[i], r2[j] = v, u
-                            solution.cost += (new_cost - old_cost)
-                            return True
+    def _pair_moves(self, solution, name):
+        # Don't-look bits per route: clean[r1] is the clock at which r1 was last
+        # scanned against all its neighboring routes without an improving move.
+        routes = solution.routes
+        loads = solution.loads
+        node_route = solution.node_route
+        candidates = self.candidates
+        evaluator = self.pair_evaluator
+        stamp = self._route_stamp
+        clean = self._clean[name]
+        queue, queued = self._active[name]
+        clock = self._clock
+        swap = name == "swap-pair"
+        evals = 0
+
+        while queue:
+            r1_idx = queue.popleft()
+            queued[r1_idx] = 0
+            r1 = routes[r1_idx]
+            if not r1: continue
+            seen = clean[r1_idx]
+            own_changed = stamp[r1_idx] > seen
+
+            neighbor_routes = sorted({node_route[b] for u in r1 for b in candidates[u]} - {r1_idx})
+            for r2_idx in neighbor_routes:
+                if not own_changed and stamp[r2_idx] <= seen: continue
+                r2 = routes[r2_idx]
+                evals += len(r1) * len(r2)
+
+                if swap:
+                    move = evaluator.best_swap(r1, loads[r1_idx], r2, loads[r2_idx])
+                else:
+                    move = evaluator.best_relocate(r1, r2, loads[r2_idx])
+                if move is None: continue
+
+                _, i, j = move
+                u = r1[i]
+                if swap:
+                    solution.set_route(r1_idx, r1[:i] + [r2[j]] + r1[i + 1:])
+                    solution.set_route(r2_idx, r2[:j] + [u] + r2[j + 1:])
+                else:
+                    solution.set_route(r1_idx, r1[:i] + r1[i + 1:])
+                    solution.set_route(r2_idx, r2[:j] + [u] + r2[j:])
+                self._touch(solution, r1_idx, r2_idx)
+                self._evals = evals
+                return True
+            clean[r1_idx] = clock
+        self._evals = evals
         return False
\ No newline at end of file